@@ -0,0 +1,12 @@
+from .bounded_sqlite_cache import BoundedSQLiteCache, BoundedSQLiteDict
+from .cache_factory import CacheFactory
+from .cache_index import CacheIndex
+from .cache_stats import CacheStats
+
+__all__ = [
+    'BoundedSQLiteCache',
+    'BoundedSQLiteDict',
+    'CacheFactory',
+    'CacheIndex',
+    'CacheStats',
+]
@@ -0,0 +1,284 @@
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from time import time
+from typing import Any
+
+from requests_cache import BaseCache, SQLiteCache, SQLiteDict
+from requests_cache.backends.base import BaseStorage
+
+
+class BoundedSQLiteDict(SQLiteDict):
+    """
+    SQLite storage limited to a byte budget, evicting the least recently
+    used responses first and optionally compressing them with zlib.
+    Every stored value starts with a flag telling whether it is
+    compressed. Access times only order evictions, so they are kept in
+    memory and written in a single batch at most once per interval, or
+    along with the next write. The total size of the stored values is
+    kept up to date by triggers, so writes from every process sharing
+    the database check the budget without summing every value.
+    """
+
+    schema_version: int = 1
+    """Version of the stored values, older values are dropped."""
+
+    flags: dict[bool, bytes] = {False: b'\x00', True: b'\x01'}
+    """Flag stored before each value, by whether it is compressed."""
+
+    def __init__(
+        self,
+        db_path: Path | str,
+        max_bytes: int,
+        compress: bool = True,
+        touch_interval: float = 60,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Initializes BoundedSQLiteDict object attributes.
+
+        :param db_path: Path of the SQLite database file.
+        :param max_bytes: Maximum size of all stored values, in bytes.
+        :param compress: Compress stored values with zlib. Default is
+         True.
+        :param touch_interval: Minimum time between writes of the access
+         times, in seconds. Default is 60.
+        :param kwargs: Additional keyword arguments for SQLiteDict.
+        """
+        self.max_bytes: int = max_bytes
+        self.compress: bool = compress
+        self.touch_interval: float = touch_interval
+        self._touched: dict[str, float] = {}
+        self._touched_at: float = time()
+        self._touched_lock: threading.Lock = threading.Lock()
+        super().__init__(db_path, **kwargs)
+
+    def init_db(self) -> None:
+        """
+        Initializes the database, adding the size and access time
+        columns used for eviction and the triggers keeping the total
+        size, which is counted again once on open. Values stored by an
+        older version are dropped, as they can not be told apart.
+        """
+        super().init_db()
+        with self.connection(commit=True) as con:
+            version: int = con.execute('PRAGMA user_version').fetchone()[0]
+            if version < self.schema_version:
+                con.execute(f'DELETE FROM {self.table_name}')
+                con.execute(f'PRAGMA user_version = {self.schema_version}')
+
+            for column in ['size INTEGER DEFAULT 0', 'accessed REAL']:
+                try:
+                    con.execute(
+                        f'ALTER TABLE {self.table_name} ADD COLUMN {column}'
+                    )
+                except sqlite3.OperationalError:
+                    pass
+
+            con.execute(
+                'CREATE INDEX IF NOT EXISTS accessed_idx '
+                f'ON {self.table_name}(accessed)'
+            )
+
+            con.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.table_name}_size ('
+                '    total INTEGER NOT NULL'
+                ')'
+            )
+            for event, change in [
+                ('INSERT', 'NEW.size'),
+                ('DELETE', '-OLD.size'),
+                ('UPDATE OF size', 'NEW.size - OLD.size'),
+            ]:
+                con.execute(
+                    'CREATE TRIGGER IF NOT EXISTS '
+                    f'{self.table_name}_size_{event.split()[0].lower()} '
+                    f'AFTER {event} ON {self.table_name} BEGIN '
+                    f'UPDATE {self.table_name}_size '
+                    f'SET total = total + COALESCE({change}, 0); END'
+                )
+
+            con.execute(f'DELETE FROM {self.table_name}_size')
+            con.execute(
+                f'INSERT INTO {self.table_name}_size (total) '
+                f'SELECT COALESCE(SUM(size), 0) FROM {self.table_name}'
+            )
+
+    def __getitem__(self, key: str) -> Any:
+        """
+        Gets a value, marking it as recently used.
+
+        :param key: Cache key.
+
+        :return: The deserialized value.
+        """
+        value: Any = super().__getitem__(key)
+        with self._touched_lock:
+            self._touched[key] = time()
+            flush: bool = time() - self._touched_at >= self.touch_interval
+
+        if flush:
+            with self.connection(commit=True) as con:
+                self._flush_touched(con)
+
+        return value
+
+    def _flush_touched(self, con: sqlite3.Connection) -> None:
+        """
+        Writes the access times kept in memory.
+
+        :param con: Connection holding the current write transaction.
+        """
+        with self._touched_lock:
+            touched: dict[str, float] = self._touched
+            self._touched = {}
+            self._touched_at = time()
+
+        con.executemany(
+            f'UPDATE {self.table_name} SET accessed = ? WHERE key = ?',
+            [(accessed, key) for key, accessed in touched.items()],
+        )
+
+    def _write(self, key: str, value: Any) -> None:
+        """
+        Writes a value and evicts the least recently used ones while the
+        storage is over its byte budget.
+
+        :param key: Cache key.
+        :param value: Value to be stored.
+        """
+        expires: int | None = getattr(value, 'expires_unix', None)
+        data: sqlite3.Binary = self.serialize(value)
+        with self.connection(commit=True) as con:
+            con.execute(f'DELETE FROM {self.table_name} WHERE key = ?', (key,))
+            con.execute(
+                f'INSERT INTO {self.table_name} '
+                '(key, value, expires, size, accessed) VALUES (?,?,?,?,?)',
+                (key, data, expires, len(data), time()),
+            )
+            self._flush_touched(con)
+            self._evict(con)
+
+    def _evict(self, con: sqlite3.Connection) -> None:
+        """
+        Deletes the least recently used values until the storage is back
+        to 90% of its byte budget, along with their tags and digests when
+        the cache index shares the database.
+
+        :param con: Connection holding the current write transaction.
+        """
+        total: int = con.execute(
+            f'SELECT total FROM {self.table_name}_size'
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target: int = int(self.max_bytes * 0.9)
+        evicted: list[str] = []
+        cursor: sqlite3.Cursor = con.execute(
+            f'SELECT key, size FROM {self.table_name} ORDER BY accessed'
+        )
+        for key, size in cursor:
+            if total <= target:
+                break
+            evicted.append(key)
+            total -= size or 0
+        cursor.close()
+
+        con.executemany(
+            f'DELETE FROM {self.table_name} WHERE key = ?',
+            [(key,) for key in evicted],
+        )
+        for (table,) in con.execute(
+            'SELECT name FROM sqlite_master '
+            "WHERE type = 'table' AND name IN ('tags', 'digests')"
+        ).fetchall():
+            con.executemany(
+                f'DELETE FROM {table} WHERE key = ?',
+                [(key,) for key in evicted],
+            )
+
+    def count_bytes(self) -> int:
+        """
+        Counts the size of all stored values.
+
+        :return: Size in bytes.
+        """
+        with self.connection() as con:
+            return con.execute(
+                f'SELECT total FROM {self.table_name}_size'
+            ).fetchone()[0]
+
+    def serialize(self, value: Any) -> sqlite3.Binary:
+        """
+        Serializes a value, compressing it when enabled, after the flag
+        telling whether it is compressed.
+
+        :param value: Value to be serialized.
+
+        :return: Serialized value.
+        """
+        data: bytes = BaseStorage.serialize(self, value)
+        if self.compress:
+            data = zlib.compress(data)
+
+        return sqlite3.Binary(self.flags[self.compress] + data)
+
+    def deserialize(self, key: str, value: bytes) -> Any:
+        """
+        Deserializes a value, decompressing it when its flag tells it
+        was stored compressed.
+
+        :param key: Cache key.
+        :param value: Stored value.
+
+        :return: Deserialized value.
+        """
+        data: bytes = bytes(value)
+        if data[:1] == self.flags[True]:
+            return super().deserialize(key, zlib.decompress(data[1:]))
+
+        return super().deserialize(key, data[1:])
+
+
+class BoundedSQLiteCache(SQLiteCache):
+    """
+    SQLite cache backend in WAL mode, safe to share between processes
+    and limited to a byte budget.
+    """
+
+    def __init__(
+        self,
+        db_path: Path | str,
+        max_bytes: int,
+        compress: bool = True,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Initializes BoundedSQLiteCache object attributes.
+
+        :param db_path: Path of the SQLite database file.
+        :param max_bytes: Maximum size of all cached responses, in
+         bytes.
+        :param compress: Compress cached responses with zlib. Default
+         is True.
+        :param kwargs: Additional keyword arguments for SQLiteDict.
+        """
+        BaseCache.__init__(self, cache_name=str(db_path))
+        kwargs.setdefault('wal', True)
+        kwargs.setdefault('busy_timeout', 30000)
+        self.responses: BoundedSQLiteDict = BoundedSQLiteDict(
+            db_path,
+            max_bytes=max_bytes,
+            compress=compress,
+            table_name='responses',
+            **kwargs,
+        )
+        self.redirects: SQLiteDict = SQLiteDict(
+            db_path,
+            table_name='redirects',
+            lock=self.responses._lock,
+            serializer=None,
+            **kwargs,
+        )
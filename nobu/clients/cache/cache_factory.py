@@ -0,0 +1,120 @@
+import hashlib
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+
+import requests_cache
+from requests import PreparedRequest
+from requests_cache import CachedSession
+
+from .bounded_sqlite_cache import BoundedSQLiteCache
+
+
+class CacheFactory:
+    """
+    Builds cached HTTP sessions for the configured cache backend. Cache
+    keys include the request credentials, so responses are never
+    shared between tokens.
+    """
+
+    backends: list[str] = ['filesystem', 'sqlite']
+
+    @staticmethod
+    def create_key(request: PreparedRequest, **kwargs: Any) -> str:
+        """
+        Creates the cache key of a request. The default key leaves the
+        credentials out, so a digest of the Authorization header is
+        mixed into it.
+
+        :param request: Request to be cached.
+        :param kwargs: Key settings of the cached session.
+
+        :return: The cache key.
+        """
+        key: str = requests_cache.create_key(request, **kwargs)
+        authorization: str | None = request.headers.get('Authorization')
+        if not authorization:
+            return key
+
+        return hashlib.blake2b(
+            f'{key}:{authorization}'.encode(), digest_size=8
+        ).hexdigest()
+
+    @classmethod
+    def create_session(
+        cls,
+        backend: str = 'filesystem',
+        cache_name: str = '.cache',
+        expire_after: timedelta = timedelta(minutes=5),
+        max_bytes: int = 100 * 1024 * 1024,
+        compress: bool = True,
+        stale_while_revalidate: timedelta | None = None,
+        allowable_methods: tuple[str, ...] = ('GET', 'HEAD'),
+    ) -> CachedSession:
+        """
+        Creates a cached session.
+
+        :param backend: Cache backend, either "filesystem" or "sqlite".
+         Default is "filesystem".
+        :param cache_name: Cache directory for the filesystem backend,
+         or database name for the sqlite backend. Default is ".cache".
+        :param expire_after: Time after which cached responses expire.
+         Default is 5 minutes.
+        :param max_bytes: Maximum size of the sqlite backend, in bytes.
+         Default is 100 MB.
+        :param compress: Compress responses stored by the sqlite
+         backend. Default is True.
+        :param stale_while_revalidate: Time after expiration during
+         which a cached response is still served at once, while a
+         background request refreshes it. If None, expired responses
+         are always refreshed before being served.
+        :param allowable_methods: HTTP methods whose responses can be
+         cached. Default is GET and HEAD.
+
+        :return: A cached session.
+
+        :raise ValueError: When the backend is unknown.
+        """
+        if backend not in cls.backends:
+            raise ValueError(
+                f'unknown cache backend {backend}, expected one of: '
+                f'{", ".join(cls.backends)}'
+            )
+
+        if backend == 'sqlite':
+            return CachedSession(
+                backend=BoundedSQLiteCache(
+                    cls.get_db_path(backend, cache_name),
+                    max_bytes=max_bytes,
+                    compress=compress,
+                ),
+                expire_after=expire_after,
+                stale_while_revalidate=stale_while_revalidate or False,
+                allowable_methods=allowable_methods,
+                key_fn=cls.create_key,
+            )
+
+        return CachedSession(
+            cache_name=cache_name,
+            backend='filesystem',
+            expire_after=expire_after,
+            stale_while_revalidate=stale_while_revalidate or False,
+            allowable_methods=allowable_methods,
+            key_fn=cls.create_key,
+        )
+
+    @classmethod
+    def get_db_path(cls, backend: str, cache_name: str) -> Path:
+        """
+        Gets the SQLite database used by a backend for the cache and
+        its index.
+
+        :param backend: Cache backend.
+        :param cache_name: Cache directory or database name.
+
+        :return: Path of the database file.
+        """
+        if backend == 'sqlite':
+            return Path(f'{cache_name}.sqlite')
+
+        return Path(cache_name) / 'index.sqlite'
@@ -0,0 +1,149 @@
+import sqlite3
+
+from nobu.commons import SqliteStore
+
+
+class CacheIndex(SqliteStore):
+    """
+    Indexes HTTP cache keys by tag, so a whole family of cached
+    responses can be found and invalidated without scanning the cache.
+    It also keeps the body digest of each cached response, to detect
+    unchanged bodies when a resource does not support conditional
+    requests, and a few named values about the cache itself.
+    """
+
+    journal_mode: str | None = None
+    """Journal mode of the database. The default one is kept, as the
+    database file may be removed along with the cache."""
+
+    def create_tables(self, connection: sqlite3.Connection) -> None:
+        """
+        Creates the index tables if they do not exist.
+
+        :param connection: Database connection.
+        """
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS tags ('
+            '    tag TEXT NOT NULL,'
+            '    key TEXT NOT NULL,'
+            '    PRIMARY KEY (tag, key)'
+            ') WITHOUT ROWID'
+        )
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS digests ('
+            '    key TEXT PRIMARY KEY,'
+            '    digest TEXT NOT NULL'
+            ') WITHOUT ROWID'
+        )
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS meta ('
+            '    name TEXT PRIMARY KEY,'
+            '    value TEXT NOT NULL'
+            ') WITHOUT ROWID'
+        )
+
+    def add(self, tag: str, key: str) -> None:
+        """
+        Adds a cache key to a tag.
+
+        :param tag: Tag of the cached resource.
+        :param key: Cache key of the response.
+        """
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR IGNORE INTO tags (tag, key) VALUES (?, ?)',
+                (tag, key),
+            )
+
+    def clear(self) -> None:
+        """
+        Removes every tag from the index. The connection is reopened, as
+        clearing the cache may have removed the database file.
+        """
+        with self._lock:
+            self._connection.close()
+            self._connection = self._connect()
+            self._connection.execute('DELETE FROM tags')
+            self._connection.execute('DELETE FROM digests')
+
+    def get_digest(self, key: str) -> str | None:
+        """
+        Gets the body digest of a cached response.
+
+        :param key: Cache key of the response.
+
+        :return: The body digest, or None if it is unknown.
+        """
+        with self._lock:
+            row: tuple[str] | None = self._connection.execute(
+                'SELECT digest FROM digests WHERE key = ?', (key,)
+            ).fetchone()
+            return row[0] if row else None
+
+    def get_value(self, name: str) -> str | None:
+        """
+        Gets a named value about the cache.
+
+        :param name: Name of the value.
+
+        :return: The value, or None if it is not set.
+        """
+        with self._lock:
+            row: tuple[str] | None = self._connection.execute(
+                'SELECT value FROM meta WHERE name = ?', (name,)
+            ).fetchone()
+            return row[0] if row else None
+
+    def keys(self, tag: str) -> list[str]:
+        """
+        Gets all cache keys of a tag.
+
+        :param tag: Tag of the cached resource.
+
+        :return: List of cache keys.
+        """
+        with self._lock:
+            cursor: sqlite3.Cursor = self._connection.execute(
+                'SELECT key FROM tags WHERE tag = ?', (tag,)
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def remove(self, tag: str) -> None:
+        """
+        Removes a tag and all of its cache keys from the index.
+
+        :param tag: Tag of the cached resource.
+        """
+        with self._lock:
+            self._connection.execute(
+                'DELETE FROM digests WHERE key IN '
+                '(SELECT key FROM tags WHERE tag = ?)',
+                (tag,),
+            )
+            self._connection.execute('DELETE FROM tags WHERE tag = ?', (tag,))
+
+    def set_digest(self, key: str, digest: str) -> None:
+        """
+        Sets the body digest of a cached response.
+
+        :param key: Cache key of the response.
+        :param digest: Digest of the response body.
+        """
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO digests (key, digest) VALUES (?, ?)',
+                (key, digest),
+            )
+
+    def set_value(self, name: str, value: str) -> None:
+        """
+        Sets a named value about the cache.
+
+        :param name: Name of the value.
+        :param value: Value to be set.
+        """
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)',
+                (name, value),
+            )
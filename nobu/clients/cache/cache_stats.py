@@ -0,0 +1,61 @@
+import threading
+from typing import ClassVar
+
+from pydantic import BaseModel, PrivateAttr, computed_field
+
+
+class CacheStats(BaseModel):
+    """
+    Counts how requests were served by the HTTP cache in this session,
+    along with the size and entry count of the whole cache, which is
+    shared by every session.
+    """
+
+    cache_fields: ClassVar[set[str]] = {'entries', 'size'}
+    """Fields describing the whole cache rather than this session."""
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    bytes_saved: int = 0
+    """Body bytes not downloaded thanks to revalidated responses."""
+
+    entries: int = 0
+    """Responses stored in the cache."""
+
+    full_fetches: int = 0
+    """Responses downloaded with a new body."""
+
+    hits: int = 0
+    """Fresh responses served from the cache."""
+
+    revalidations: int = 0
+    """Responses revalidated by the server without sending a body."""
+
+    size: int = 0
+    """Size of the cache, in bytes."""
+
+    stale_hits: int = 0
+    """Expired responses served from the cache while being refreshed
+    in background."""
+
+    unchanged: int = 0
+    """Responses downloaded again with a body identical to the cached
+    one."""
+
+    @computed_field
+    @property
+    def hit_ratio(self) -> float:
+        """Ratio of requests served without downloading a body."""
+        served: int = self.hits + self.stale_hits + self.revalidations
+        total: int = served + self.unchanged + self.full_fetches
+        return served / total if total else 0.0
+
+    def add(self, counter: str, value: int = 1) -> None:
+        """
+        Increments a counter in a thread-safe way.
+
+        :param counter: Name of the counter.
+        :param value: Value to be added. Default is 1.
+        """
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + value)
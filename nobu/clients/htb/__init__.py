@@ -1,3 +1,4 @@
 from .htb_client import HtbClient
+from .htb_resource import HtbResource
 
-__all__ = ['HtbClient']
+__all__ = ['HtbClient', 'HtbResource']
@@ -1,20 +1,52 @@
+import hashlib
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
-from typing import Any
+from math import ceil
+from typing import Any, Iterator
+from urllib.parse import parse_qs, urlparse
 
 from requests_cache import CachedResponse, CachedSession, OriginalResponse
 
+from nobu.clients.cache import CacheFactory, CacheIndex, CacheStats
 from nobu.commons import BearerAuth
 
+from .htb_resource import HtbResource
+
 
 class HtbClient:
-    def __init__(self, token: str, timeout: int = 30) -> None:
+    stats: CacheStats = CacheStats()
+
+    def __init__(
+        self,
+        token: str,
+        timeout: int = 30,
+        max_workers: int = 8,
+        cache_backend: str = 'filesystem',
+        cache_name: str = '.cache',
+        cache_max_bytes: int = 100 * 1024 * 1024,
+        cache_compress: bool = True,
+        cache_stale_while_revalidate: int = 24 * 60 * 60,
+    ) -> None:
         """
         Initializes all HtbClient object attributes.
 
         :param token: User bearer token.
         :param timeout: Timeout for HTTP requests. Default is 30
          seconds.
+        :param max_workers: Maximum number of pages fetched at the same
+         time in parallel pagination mode. Default is 8.
+        :param cache_backend: Cache backend, either "filesystem" or
+         "sqlite". Default is "filesystem".
+        :param cache_name: Cache directory or database name. Default is
+         ".cache".
+        :param cache_max_bytes: Maximum size of the sqlite cache, in
+         bytes. Default is 100 MB.
+        :param cache_compress: Compress responses stored by the sqlite
+         cache. Default is True.
+        :param cache_stale_while_revalidate: Seconds after expiration
+         during which a cached response is served at once while it is
+         refreshed in background. Default is 1 day.
         """
         self.logger: logging.Logger = logging.getLogger(
             self.__class__.__name__
@@ -25,76 +57,325 @@ class HtbClient:
             'User-Agent': 'Nobu',
             'Accept': 'application/json',
         }
-        self.session: CachedSession = CachedSession(
-            cache_name='.cache',
-            backend='filesystem',
+        self.resources: dict[HtbResource, str] = {
+            HtbResource.ACTIVE_MACHINES: 'machine/paginated',
+            HtbResource.MACHINE_PROFILES: 'machine/profile',
+            HtbResource.RETIRED_MACHINES: 'machine/list/retired/paginated',
+        }
+        self.session: CachedSession = CacheFactory.create_session(
+            backend=cache_backend,
+            cache_name=cache_name,
             expire_after=timedelta(minutes=5),
+            max_bytes=cache_max_bytes,
+            compress=cache_compress,
+            stale_while_revalidate=timedelta(
+                seconds=cache_stale_while_revalidate
+            ),
+        )
+        self.cache_index: CacheIndex = CacheIndex(
+            CacheFactory.get_db_path(cache_backend, cache_name)
         )
         self.timeout: int = timeout
+        self.max_workers: int = max_workers
 
-    def list_machines(
-        self, size: int = 100, retired: bool = False, update: bool = False
-    ) -> dict[str, Any]:
+    def _get_page(
+        self,
+        url: str,
+        params: dict[str, int],
+        resource: HtbResource,
+        update: bool = False,
+    ) -> tuple[dict[str, Any], str]:
         """
-        Lists machines.
+        Gets a single page of a resource through the cached session,
+        tagging its cache entry with the resource it belongs
+        to.
+
+        Entries expired for less than the stale window are served at
+        once and refreshed in background. Older or updated entries are
+        revalidated with the server when they hold an ETag or
+        Last-Modified validator. Otherwise they are downloaded again
+        and their body digest is compared with the cached one, so an
+        unchanged page can still skip parsing.
+
+        :param url: Resource URL.
+        :param params: Query parameters of the page.
+        :param resource: Resource the page belongs to.
+        :param update: Revalidate the cached page with the server
+         rather than getting it from cache.
+
+        :return: A dictionary containing the page content, and the
+         digest of the response body.
+        """
+        kwargs: dict[str, Any] = {
+            'url': url,
+            'headers': self.base_headers,
+            'params': params,
+            'timeout': self.timeout,
+            'auth': BearerAuth(self.token),
+        }
+
+        response: OriginalResponse | CachedResponse = self.session.get(
+            **kwargs, refresh=update
+        )
+        if update and response.from_cache and not response.revalidated:
+            response: OriginalResponse = self.session.get(
+                **kwargs, force_refresh=True
+            )
+
+        response.raise_for_status()
+
+        digest: str = hashlib.sha256(response.content).hexdigest()
+        if response.from_cache and response.revalidated:
+            HtbClient.stats.add('revalidations')
+            HtbClient.stats.add('bytes_saved', len(response.content))
+        elif response.from_cache:
+            HtbClient.stats.add(
+                'stale_hits' if response.is_expired else 'hits'
+            )
+        elif response.cache_key:
+            previous: str | None = self.cache_index.get_digest(
+                response.cache_key
+            )
+            HtbClient.stats.add(
+                'unchanged' if previous == digest else 'full_fetches'
+            )
+            self.cache_index.add(resource.value, response.cache_key)
+            self.cache_index.set_digest(response.cache_key, digest)
+        else:
+            HtbClient.stats.add('full_fetches')
+
+        return response.json(), digest
+
+    @staticmethod
+    def _get_last_page(results: dict[str, Any]) -> int:
+        """
+        Gets the number of the last page from a paginated response,
+        reading it from ``meta`` or, when missing, from the ``last``
+        link.
+
+        :param results: First page of a paginated resource.
+
+        :return: Number of the last page.
+        """
+        meta: dict[str, Any] = results.get('meta') or {}
+        if meta.get('last_page'):
+            return int(meta['last_page'])
+
+        last_link: str | None = (results.get('links') or {}).get('last')
+        if last_link:
+            query: dict[str, list[str]] = parse_qs(urlparse(last_link).query)
+            if query.get('page'):
+                return int(query['page'][0])
+
+        return 1
+
+    def get_cache_stats(self) -> CacheStats:
+        """
+        Gets the counters of how responses were served in this session,
+        along with the current size and entry count of the cache.
+
+        :return: Cache statistics.
+        """
+        try:
+            responses: Any = self.session.cache.responses
+            size: int = (
+                responses.count_bytes()
+                if hasattr(responses, 'count_bytes')
+                else responses.size()
+            )
+            return HtbClient.stats.model_copy(
+                update={'entries': len(responses), 'size': size}
+            )
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    def get_machine_profile(self, identifier: int | str) -> dict[str, Any]:
+        """
+        Gets the profile of a single machine.
+
+        :param identifier: Machine identifier or name.
+
+        :return: A dictionary containing the machine information.
+
+        :raise Exception: When an unexpected error occurs.
+        """
+        try:
+            resource: HtbResource = HtbResource.MACHINE_PROFILES
+            url: str = (
+                f'{self.base_url}/{self.resources[resource]}/{identifier}'
+            )
+            profile, _ = self._get_page(url, {}, resource)
+            return profile
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    def _clear_untagged(self) -> None:
+        """
+        Removes the HTB responses cached before responses were tagged,
+        which the cache index cannot find. The cache is scanned only
+        once, and the scan is recorded in the index.
+        """
+        if self.cache_index.get_value('htb_untagged_cleared'):
+            return
+
+        tagged: set[str] = {
+            key
+            for resource in HtbResource
+            for key in self.cache_index.keys(resource.value)
+        }
+        keys: list[str] = [
+            response.cache_key
+            for response in self.session.cache.filter(expired=True)
+            if response.url.startswith(self.base_url)
+            and response.cache_key not in tagged
+        ]
+        if keys:
+            self.session.cache.delete(*keys)
+
+        self.cache_index.set_value('htb_untagged_cleared', '1')
+
+    def invalidate(self, resource: HtbResource | None = None) -> None:
+        """
+        Removes all cached responses of a resource, looking them up in
+        the cache index rather than scanning the whole cache. Responses
+        cached before they were tagged are found by a single scan of the
+        cache, on first use.
+
+        :param resource: Resource to be invalidated. If None, the whole
+         cache is cleared.
+        """
+        try:
+            if not resource:
+                self.session.cache.clear()
+                self.cache_index.clear()
+                self.cache_index.set_value('htb_untagged_cleared', '1')
+                return
+
+            self._clear_untagged()
+            keys: list[str] = self.cache_index.keys(resource.value)
+            if keys:
+                self.session.cache.delete(*keys)
+
+            self.cache_index.remove(resource.value)
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    def iter_pages(
+        self,
+        size: int = 100,
+        retired: bool = False,
+        update: bool = False,
+        parallel: bool = True,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Iterates over machine pages as they arrive, stopping as soon as
+        enough machines were fetched. The page size is picked from the
+        requested size, so small listings are served by a single small
+        page.
 
         :param size: Quantity of machines to be returned.
         :param retired: List only retired machines.
-        :param update: Force update the result rather than getting
-         from cache.
+        :param update: Revalidate the results with the server rather
+         than getting them from cache.
+        :param parallel: Fetch the remaining pages at the same time
+         once the page count is known from the first page, rather than
+         following the next links one by one.
 
-        :return: A dictionary containing a list of machines.
+        :return: An iterator over dictionaries containing a page of
+         machines each, along with the digest of the page body.
 
         :raise ValueError: When size value is lesser than 0.
         """
         if size < 0:
             raise ValueError('size value cannot be lesser than 0.')
 
+        if size == 0:
+            return
+
         try:
-            resource_url: str = (
-                'machine/paginated'
+            resource: HtbResource = (
+                HtbResource.ACTIVE_MACHINES
                 if not retired
-                else 'machine/list/retired/paginated'
+                else HtbResource.RETIRED_MACHINES
             )
-            url: str = f'{self.base_url}/{resource_url}'
-
-            if update:
-                [
-                    self.session.cache.delete(urls=[item])
-                    for item in self.session.cache.urls()
-                    if url in item
-                ]
+            url: str = f'{self.base_url}/{self.resources[resource]}'
 
-            results: dict[str, Any] = {}
-            machines: list[dict[str, Any]] = []
             min_size: int = 5
             max_size: int = 100
-            per_page: int = max_size if size < min_size else max_size
-            while len(machines) < size:
-                params: dict[str, int] = {'per_page': per_page}
-
-                response: OriginalResponse | CachedResponse = self.session.get(
-                    url=url,
-                    headers=self.base_headers,
-                    params=params,
-                    timeout=self.timeout,
-                    auth=BearerAuth(self.token),
+            per_page: int = min(max(size, min_size), max_size)
+            params: dict[str, int] = {'per_page': per_page}
+            results, digest = self._get_page(url, params, resource, update)
+            fetched: int = len(results['data'])
+            yield results, digest
+
+            last_page: int = min(
+                self._get_last_page(results), ceil(size / per_page)
+            )
+            if parallel and last_page > 1:
+                pages: list[dict[str, int]] = [
+                    {'per_page': per_page, 'page': page}
+                    for page in range(2, last_page + 1)
+                ]
+                executor: ThreadPoolExecutor = ThreadPoolExecutor(
+                    max_workers=min(self.max_workers, len(pages))
                 )
+                try:
+                    for page in executor.map(
+                        lambda page_params: self._get_page(
+                            url, page_params, resource, update
+                        ),
+                        pages,
+                    ):
+                        yield page
+                finally:
+                    executor.shutdown(wait=False, cancel_futures=True)
 
-                response.raise_for_status()
+            else:
+                while fetched < size and results['links']['next']:
+                    results, digest = self._get_page(
+                        results['links']['next'], params, resource, update
+                    )
+                    fetched += len(results['data'])
+                    yield results, digest
 
-                results: dict[str, Any] = response.json()
-                machines.extend(results['data'])
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    def list_machines(
+        self,
+        size: int = 100,
+        retired: bool = False,
+        update: bool = False,
+        parallel: bool = True,
+    ) -> dict[str, Any]:
+        """
+        Lists machines.
 
-                links: dict[str, str] = results['links']
-                if not links['next']:
-                    break
+        :param size: Quantity of machines to be returned.
+        :param retired: List only retired machines.
+        :param update: Force update the result rather than getting
+         from cache.
+        :param parallel: Fetch the remaining pages at the same time
+         once the page count is known from the first page, rather than
+         following the next links one by one.
 
-                url: str = links['next']
+        :return: A dictionary containing a list of machines.
 
-            results['data']: list[str, Any] = machines[:size]
-            return results
+        :raise ValueError: When size value is lesser than 0.
+        """
+        results: dict[str, Any] = {}
+        machines: list[dict[str, Any]] = []
+        for results, _ in self.iter_pages(
+            size=size, retired=retired, update=update, parallel=parallel
+        ):
+            machines.extend(results['data'])
 
-        except Exception as ex:
-            self.logger.exception(str(ex), exc_info=True)
-            raise
+        results['data']: list[str, Any] = machines[:size]
+        return results
@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class HtbResource(Enum):
+    ACTIVE_MACHINES = 'active'
+    MACHINE_PROFILES = 'profiles'
+    RETIRED_MACHINES = 'retired'
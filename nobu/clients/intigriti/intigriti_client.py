@@ -1,17 +1,33 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from math import ceil
 from typing import Any
 
 import requests
+from requests_cache import CachedSession
+
+from nobu.clients.session import SessionFactory
 
 
 class IntigritiClient:
-    def __init__(self, token: str, timeout: int = 30) -> None:
+    def __init__(
+        self,
+        token: str,
+        timeout: int = 30,
+        session: CachedSession | None = None,
+        max_workers: int = 8,
+    ) -> None:
         """
         Initializes all IntigritiClient object attributes.
 
         :param token: User personal access token.
         :param timeout: Timeout for HTTP requests. Default is 30
          seconds.
+        :param session: Cached session the requests are sent through.
+         If None, the default shared session is used.
+        :param max_workers: Maximum number of pages fetched at the same
+         time. Default is 8.
         """
         self.logger: logging.Logger = logging.getLogger(
             self.__class__.__name__
@@ -24,6 +40,39 @@ class IntigritiClient:
             'Authorization': f'Bearer {token}',
         }
         self.timeout: int = timeout
+        self.max_workers: int = max_workers
+        self.page_size: int = 500
+        self.expire_after: dict[str, timedelta] = {
+            'programs': timedelta(minutes=5),
+            'program_details': timedelta(minutes=30),
+        }
+        self.session: CachedSession = session or SessionFactory.get_session()
+
+    def _get_programs_page(
+        self, params: dict[str, Any], update: bool = False
+    ) -> dict[str, Any]:
+        """
+        Gets a single page of programs, through the cache.
+
+        :param params: Query parameters of the page.
+        :param update: Fetch the page from the server rather than
+         getting it from cache.
+
+        :return: A dictionary containing the page records and the total
+         count of programs.
+        """
+        response: requests.Response = self.session.get(
+            url=f'{self.base_url}/programs',
+            headers=self.headers,
+            params=params,
+            timeout=self.timeout,
+            expire_after=self.expire_after['programs'],
+            force_refresh=update,
+        )
+
+        response.raise_for_status()
+
+        return response.json()
 
     def get_all_programs(
         self,
@@ -32,16 +81,23 @@ class IntigritiClient:
         status_id: int | None = None,
         offset: int | None = 0,
         type_id: int | None = None,
+        update: bool = False,
     ) -> list[dict[str, Any]]:
         """
-        Lists all Intigriti programs for your user.
+        Lists all Intigriti programs for your user. The first page
+        returns the total count of programs, then the remaining pages
+        are fetched at the same time and merged in order.
 
         :param following: Indicates whether you are following the
          program.
-        :param limit: Limit of programs to be returned.
+        :param limit: Limit of programs to be returned. Pages hold up to
+         500 programs, but the limit is not capped: pass
+         ``sys.maxsize`` to get every program.
         :param offset: Get programs starting by the specified offset.
         :param status_id: Current status of the program.
         :param type_id: Type of program.
+        :param update: Fetch the programs from the server rather than
+         getting them from cache.
 
         :return: A list of programs.
 
@@ -53,14 +109,12 @@ class IntigritiClient:
             if limit <= 0:
                 raise ValueError('limit value cannot be lesser or equals 0.')
 
-            resource_url: str = f'{self.base_url}/programs'
-
-            max_size: int = 500
-            limit: int = max_size if limit > max_size else limit
+            offset: int = offset or 0
+            page_size: int = min(limit, self.page_size)
 
             params: dict[str, Any] = {
                 'following': following,
-                'limit': limit,
+                'limit': page_size,
                 'offset': offset,
                 'statusId': status_id,
                 'typeId': type_id,
@@ -72,34 +126,45 @@ class IntigritiClient:
                 if value is not None
             }
 
-            records: list[dict[str, Any]] = []
-            while len(records) < limit:
-                response: requests.Response = requests.get(
-                    url=resource_url,
-                    headers=self.headers,
-                    params=params,
-                    timeout=self.timeout,
-                )
-
-                response.raise_for_status()
-
-                dict_response = response.json()
-                records.extend(dict_response['records'])
-                params['offset'] += limit
-                if len(records) == dict_response['maxCount']:
-                    break
-
-            return records
+            dict_response: dict[str, Any] = self._get_programs_page(
+                params, update
+            )
+            records: list[dict[str, Any]] = dict_response['records']
+
+            size: int = min(limit, max(dict_response['maxCount'] - offset, 0))
+            if len(records) >= size or len(records) < page_size:
+                return records[:size]
+
+            pages: list[dict[str, Any]] = [
+                {**params, 'offset': offset + page * page_size}
+                for page in range(1, ceil(size / page_size))
+            ]
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(pages))
+            ) as executor:
+                for page in executor.map(
+                    lambda page_params: self._get_programs_page(
+                        page_params, update
+                    ),
+                    pages,
+                ):
+                    records.extend(page['records'])
+
+            return records[:size]
 
         except Exception as ex:
             self.logger.exception(str(ex), exc_info=True)
             raise
 
-    def get_program_details(self, program_id: str) -> dict[str, Any]:
+    def get_program_details(
+        self, program_id: str, update: bool = False
+    ) -> dict[str, Any]:
         """
         Gets program information.
 
         :param program_id: Program identifier.
+        :param update: Fetch the program from the server rather than
+         getting it from cache.
 
         :return: A program with its information.
 
@@ -108,10 +173,12 @@ class IntigritiClient:
         try:
             resource_url: str = f'{self.base_url}/programs/{program_id}'
 
-            response: requests.Response = requests.get(
+            response: requests.Response = self.session.get(
                 url=resource_url,
                 headers=self.headers,
                 timeout=self.timeout,
+                expire_after=self.expire_after['program_details'],
+                force_refresh=update,
             )
 
             response.raise_for_status()
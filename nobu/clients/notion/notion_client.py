@@ -1,8 +1,12 @@
 import logging
+from datetime import timedelta
 from typing import Any
 
 import requests
+from requests_cache import CachedSession
 
+from nobu.clients.cache import CacheFactory, CacheIndex
+from nobu.clients.session import SessionFactory
 from nobu.commons import BearerAuth
 
 from .filters.query_filter import QueryFilter
@@ -11,7 +15,12 @@ from .sorts.query_sort import QuerySort
 
 class NotionClient:
     def __init__(
-        self, token: str, version: str = '2022-06-28', timeout: int = 30
+        self,
+        token: str,
+        version: str = '2022-06-28',
+        timeout: int = 30,
+        session: CachedSession | None = None,
+        cache_index: CacheIndex | None = None,
     ) -> None:
         self.logger: logging.Logger = logging.getLogger(
             self.__class__.__name__
@@ -22,6 +31,18 @@ class NotionClient:
             'Notion-Version': version,
         }
         self.timeout: int = timeout
+        self.auth: BearerAuth = BearerAuth(token)
+        self.session: CachedSession = session or SessionFactory.get_session()
+        SessionFactory.mount_read_only(
+            self.session,
+            [f'{self.base_url}/search', f'{self.base_url}/databases/'],
+        )
+        self.cache_index: CacheIndex = cache_index or CacheIndex(
+            CacheFactory.get_db_path('filesystem', '.cache')
+        )
+        self.expire_after: dict[str, timedelta] = {
+            'search': timedelta(minutes=1),
+        }
 
     def create_database(
         self,
@@ -49,15 +70,16 @@ class NotionClient:
                 key: value for key, value in body.items() if value is not None
             }
 
-            response: requests.Response = requests.post(
+            response: requests.Response = self.session.post(
                 url=resource_url,
                 headers=headers,
                 json=body,
                 timeout=self.timeout,
-                auth=BearerAuth(self.token),
+                auth=self.auth,
             )
 
             response.raise_for_status()
+            self.invalidate()
 
             return response.json()
 
@@ -91,15 +113,16 @@ class NotionClient:
                 key: value for key, value in body.items() if value is not None
             }
 
-            response: requests.Response = requests.post(
+            response: requests.Response = self.session.post(
                 url=resource_url,
                 headers=headers,
                 json=body,
                 timeout=self.timeout,
-                auth=BearerAuth(self.token),
+                auth=self.auth,
             )
 
             response.raise_for_status()
+            self.invalidate()
 
             return response.json()
 
@@ -107,6 +130,67 @@ class NotionClient:
             self.logger.exception(str(ex), exc_info=True)
             raise
 
+    def invalidate(self) -> None:
+        try:
+            keys: list[str] = self.cache_index.keys('notion-search')
+            if keys:
+                self.session.cache.delete(*keys)
+
+            self.cache_index.remove('notion-search')
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    def query_database(
+        self,
+        database_id: str,
+        start_cursor: str | None = None,
+        page_size: int | None = None,
+    ) -> dict[str, Any]:
+        try:
+            resource_url: str = (
+                f'{self.base_url}/databases/{database_id}/query'
+            )
+
+            headers: dict[str, str] = self.base_headers
+            headers['Content-Type']: str = 'application/json'
+
+            body: dict[str, Any] = {
+                'start_cursor': start_cursor,
+                'page_size': page_size,
+            }
+
+            body: dict[str, Any] = {
+                key: value for key, value in body.items() if value is not None
+            }
+
+            results: list[dict[str, Any]] = []
+            while True:
+                response: requests.Response = self.session.post(
+                    url=resource_url,
+                    headers=headers,
+                    json=body,
+                    timeout=self.timeout,
+                    auth=self.auth,
+                )
+
+                response.raise_for_status()
+
+                dict_response: dict[str, Any] = response.json()
+                results.extend(dict_response['results'])
+
+                has_more: bool = dict_response['has_more']
+                if has_more:
+                    body['start_cursor']: str = dict_response['next_cursor']
+                else:
+                    dict_response['results']: list[dict[str, Any]] = results
+                    return dict_response
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
     def search_by_title(
         self,
         query: str,
@@ -114,6 +198,7 @@ class NotionClient:
         query_filter: QueryFilter | None = None,
         start_cursor: str | None = None,
         page_size: int | None = None,
+        update: bool = False,
     ) -> dict[str, Any]:
         try:
             resource_url: str = f'{self.base_url}/search'
@@ -135,15 +220,19 @@ class NotionClient:
 
             results: list[dict[str, Any]] = []
             while True:
-                response: requests.Response = requests.post(
+                response: requests.Response = self.session.post(
                     url=resource_url,
                     headers=headers,
                     json=body,
                     timeout=self.timeout,
-                    auth=BearerAuth(self.token),
+                    auth=self.auth,
+                    expire_after=self.expire_after['search'],
+                    force_refresh=update,
                 )
 
                 response.raise_for_status()
+                if not response.from_cache:
+                    self.cache_index.add('notion-search', response.cache_key)
 
                 dict_response: dict[str, Any] = response.json()
                 results.extend(dict_response['results'])
@@ -158,3 +247,28 @@ class NotionClient:
         except Exception as ex:
             self.logger.exception(str(ex), exc_info=True)
             raise
+
+    def update_page(
+        self, page_id: str, properties: dict[str, Any]
+    ) -> dict[str, Any]:
+        try:
+            resource_url: str = f'{self.base_url}/pages/{page_id}'
+
+            headers: dict[str, str] = self.base_headers
+            headers['Content-Type']: str = 'application/json'
+
+            response: requests.Response = self.session.patch(
+                url=resource_url,
+                headers=headers,
+                json={'properties': properties},
+                timeout=self.timeout,
+                auth=self.auth,
+            )
+
+            response.raise_for_status()
+
+            return response.json()
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
@@ -0,0 +1,3 @@
+from .session_factory import SessionFactory
+
+__all__ = ['SessionFactory']
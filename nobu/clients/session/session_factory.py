@@ -0,0 +1,182 @@
+import threading
+from datetime import timedelta
+
+from requests.adapters import HTTPAdapter
+from requests_cache import DO_NOT_CACHE, CachedSession
+from urllib3.util import Retry
+
+from nobu.clients.cache import CacheFactory
+
+
+class SessionFactory:
+    """
+    Builds HTTP sessions holding a pool of keep-alive connections and
+    retrying transient errors. Sessions are shared by every client
+    built with the same settings, so connections are reused across
+    requests, pages and commands rather than opened for each request.
+
+    Sessions are backed by the HTTP cache, but store nothing by
+    default: only requests setting their own expiration, such as
+    reads, are cached.
+    """
+
+    status_forcelist: tuple[int, ...] = (429, 500, 502, 503, 504)
+    """Response status codes retried, when the method is idempotent."""
+
+    read_only_methods: frozenset[str] = frozenset({
+        *Retry.DEFAULT_ALLOWED_METHODS,
+        'POST',
+    })
+    """Methods retried by adapters of read-only POST endpoints."""
+
+    _lock: threading.Lock = threading.Lock()
+    _sessions: dict[tuple[object, ...], CachedSession] = {}
+
+    @classmethod
+    def mount_read_only(
+        cls, session: CachedSession, prefixes: list[str]
+    ) -> None:
+        """
+        Mounts an adapter retrying POST requests on a transient error
+        status, for URL prefixes of endpoints that only read data
+        through POST, such as searches and queries. The adapter keeps
+        the pool size and retries of the session. Other POST requests
+        are still not retried, as they may not be safe to repeat.
+
+        :param session: Session to mount the adapter on.
+        :param prefixes: URL prefixes of the read-only endpoints.
+        """
+        with cls._lock:
+            missing: list[str] = [
+                prefix for prefix in prefixes if prefix not in session.adapters
+            ]
+            if not missing:
+                return
+
+            base: HTTPAdapter = session.get_adapter(missing[0])
+            adapter: HTTPAdapter = HTTPAdapter(
+                pool_connections=base._pool_connections,
+                pool_maxsize=base._pool_maxsize,
+                max_retries=base.max_retries.new(
+                    allowed_methods=cls.read_only_methods
+                ),
+            )
+            for prefix in missing:
+                session.mount(prefix, adapter)
+
+    @classmethod
+    def create_session(
+        cls,
+        pool_size: int = 10,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        cache_backend: str = 'filesystem',
+        cache_name: str = '.cache',
+        cache_max_bytes: int = 100 * 1024 * 1024,
+        cache_compress: bool = True,
+        cache_stale_while_revalidate: int = 24 * 60 * 60,
+    ) -> CachedSession:
+        """
+        Creates a session with a connection pool, retries and a cache.
+
+        :param pool_size: Maximum connections kept alive per host.
+         Default is 10.
+        :param retries: Maximum retries of a request that failed to
+         connect, or of an idempotent request answered with a transient
+         error status. Default is 3.
+        :param backoff_factor: Factor of the exponential delay between
+         retries, in seconds. A Retry-After header takes precedence.
+         Default is 0.5.
+        :param cache_backend: Cache backend, either "filesystem" or
+         "sqlite". Default is "filesystem".
+        :param cache_name: Cache directory or database name. Default is
+         ".cache".
+        :param cache_max_bytes: Maximum size of the sqlite cache, in
+         bytes. Default is 100 MB.
+        :param cache_compress: Compress responses stored by the sqlite
+         cache. Default is True.
+        :param cache_stale_while_revalidate: Seconds after expiration
+         during which a cached response is served at once while it is
+         refreshed in background. Default is 1 day.
+
+        :return: A cached session.
+        """
+        adapter: HTTPAdapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=backoff_factor,
+                status_forcelist=cls.status_forcelist,
+                raise_on_status=False,
+            ),
+        )
+
+        session: CachedSession = CacheFactory.create_session(
+            backend=cache_backend,
+            cache_name=cache_name,
+            expire_after=DO_NOT_CACHE,
+            max_bytes=cache_max_bytes,
+            compress=cache_compress,
+            stale_while_revalidate=timedelta(
+                seconds=cache_stale_while_revalidate
+            ),
+            allowable_methods=('GET', 'HEAD', 'POST'),
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        return session
+
+    @classmethod
+    def get_session(
+        cls,
+        pool_size: int = 10,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        cache_backend: str = 'filesystem',
+        cache_name: str = '.cache',
+        cache_max_bytes: int = 100 * 1024 * 1024,
+        cache_compress: bool = True,
+        cache_stale_while_revalidate: int = 24 * 60 * 60,
+    ) -> CachedSession:
+        """
+        Gets the session shared by the clients using the same settings,
+        creating it on first use.
+
+        :param pool_size: Maximum connections kept alive per host.
+         Default is 10.
+        :param retries: Maximum retries of a request that failed to
+         connect, or of an idempotent request answered with a transient
+         error status. Default is 3.
+        :param backoff_factor: Factor of the exponential delay between
+         retries, in seconds. Default is 0.5.
+        :param cache_backend: Cache backend, either "filesystem" or
+         "sqlite". Default is "filesystem".
+        :param cache_name: Cache directory or database name. Default is
+         ".cache".
+        :param cache_max_bytes: Maximum size of the sqlite cache, in
+         bytes. Default is 100 MB.
+        :param cache_compress: Compress responses stored by the sqlite
+         cache. Default is True.
+        :param cache_stale_while_revalidate: Seconds after expiration
+         during which a cached response is served at once while it is
+         refreshed in background. Default is 1 day.
+
+        :return: The shared session.
+        """
+        key: tuple[object, ...] = (
+            pool_size,
+            retries,
+            backoff_factor,
+            cache_backend,
+            cache_name,
+            cache_max_bytes,
+            cache_compress,
+            cache_stale_while_revalidate,
+        )
+        with cls._lock:
+            if key not in cls._sessions:
+                cls._sessions[key] = cls.create_session(*key)
+
+            return cls._sessions[key]
@@ -1,8 +1,19 @@
+import sys
+import threading
+from bisect import insort
+from functools import partial
+from pathlib import Path
+
 from rich.table import Table
 
+from nobu.clients.cache import CacheStats
 from nobu.commons import Printer
 from nobu.core.htb import HtbService
-from nobu.core.htb.entities import HtbMachine
+from nobu.core.htb.entities import (
+    HtbMachine,
+    HtbMachineSlim,
+    HtbMachineStats,
+)
 from nobu.core.notion import NotionDatabase, NotionPage
 
 from . import NobuCmd
@@ -18,7 +29,62 @@ class HtbCmd(NobuCmd):
         Initializes HtbCmd object.
         """
         super().__init__('htb')
-        self.machines: list[HtbMachine] | None = None
+        self.machines: list[HtbMachine | HtbMachineSlim] | None = None
+
+    def _machines_table(self) -> Table:
+        """
+        Builds the machines table from the machines listed so far.
+
+        :return: Table with a row per machine.
+        """
+        table: Table = Table()
+        columns: list[str] = [
+            'ID',
+            'Machine',
+            'Difficulty',
+            'OS',
+            'Rating',
+            'User Owns',
+            'System Owns',
+        ]
+
+        for index, column in enumerate(columns):
+            if index == 1:
+                table.add_column(column, header_style='b', justify='left')
+            elif index == len(columns):
+                table.add_column(column, header_style='b', justify='right')
+            else:
+                table.add_column(column, header_style='b', justify='center')
+
+        for machine in tuple(self.machines or []):
+            table.add_row(
+                str(machine.id),
+                machine.name,
+                machine.difficulty_text,
+                machine.os,
+                str(machine.stars),
+                str(machine.user_owns_count),
+                str(machine.root_owns_count),
+            )
+
+        return table
+
+    def _warm_up(self) -> None:
+        """
+        Warms the most used listings, ignoring any error, as the
+        commands report them when they run.
+        """
+        try:
+            HtbService().warm_up()
+        except Exception:
+            pass
+
+    def preloop(self) -> None:
+        """
+        Starts warming the most used listings in background when the
+        module is entered.
+        """
+        threading.Thread(target=self._warm_up, daemon=True).start()
 
     def do_add(self, line: str | None = None) -> bool:
         try:
@@ -32,79 +98,79 @@ class HtbCmd(NobuCmd):
                 super().do_dbs()
                 return False
 
-            identifier: str = args[-1]
-            if identifier.isdigit():
-                identifier: int = int(identifier)
-            else:
-                Printer.err('invalid machine identifier')
+            identifiers: list[str] = [arg for arg in args if arg]
+            if not identifiers:
+                Printer.err('missing machine identifier')
                 return False
 
-            if not self.machines:
-                service: HtbService = HtbService()
-                self.machines = service.list_machines(
-                    size=50, update=True, retired=False
-                )
-
-            machine: HtbMachine | None = None
-            for item in self.machines:
-                if identifier == item.id:
-                    machine = item
-                    break
-
-            if not machine:
-                Printer.err('machine not found')
-                return False
+            service: HtbService = HtbService()
+            for identifier in identifiers:
+                machine: HtbMachine | None = service.get_machine(identifier)
+                if not machine:
+                    Printer.err(f'machine {identifier} not found')
+                    continue
 
-            NobuCmd.notion.add_htb_machine(machine, context.identifier)
-            Printer.suc(
-                f'machine {machine.name} added to {context.title} database'
-            )
+                NobuCmd.notion.add_htb_machine(machine, context.identifier)
+                Printer.suc(
+                    f'machine {machine.name} added to {context.title} database'
+                )
 
         except Exception as ex:
             Printer.err(str(ex))
 
-    def do_machines(self, line: str | None = None) -> None:
+    def do_analytics(self, line: str | None = None) -> bool:
         try:
             args: list[str] = line.split(' ')
-            update: bool = '-u' in args
-            retired: bool = '-r' in args
-            size: int = int(args[args.index('-s') + 1]) if '-s' in args else 5
+            retired: bool | None = True if '-r' in args else None
+            size: int = int(args[args.index('-s') + 1]) if '-s' in args else 10
+            metric: str = (
+                args[args.index('--sort') + 1] if '--sort' in args else '-gap'
+            )
 
             service: HtbService = HtbService()
-            self.machines: list[HtbMachine] = service.list_machines(
-                size=size, update=update, retired=retired
+            stats: list[HtbMachineStats] = service.analyze_machines(
+                metric=metric, size=size, retired=retired
             )
 
+            if not stats:
+                Printer.war('no machines found, try listing them first')
+                return False
+
             table: Table = Table()
             columns: list[str] = [
                 'ID',
                 'Machine',
                 'Difficulty',
-                'OS',
+                'Perceived',
+                'Gap',
+                'Gap Pct',
+                'Owns/Day',
+                'Root',
                 'Rating',
-                'User Owns',
-                'System Owns',
             ]
-
             for index, column in enumerate(columns):
-                if index == 1:
-                    table.add_column(column, header_style='b', justify='left')
-                elif index == len(columns):
-                    table.add_column(column, header_style='b', justify='right')
-                else:
-                    table.add_column(
-                        column, header_style='b', justify='center'
-                    )
+                table.add_column(
+                    column,
+                    header_style='b',
+                    justify='left' if index == 1 else 'center',
+                )
 
-            for machine in self.machines:
+            for item in stats:
                 table.add_row(
-                    str(machine.id),
-                    machine.name,
-                    machine.difficulty_text,
-                    machine.os,
-                    str(machine.stars),
-                    str(machine.user_owns_count),
-                    str(machine.root_owns_count),
+                    str(item.id),
+                    item.name,
+                    item.difficulty_text,
+                    *[
+                        '-' if value is None else format(value, spec)
+                        for value, spec in [
+                            (item.perceived_difficulty, ''),
+                            (item.difficulty_gap, '+'),
+                            (item.gap_percentile, '.0f'),
+                            (item.owns_per_day, ''),
+                            (item.root_ratio, '.0%'),
+                            (item.stars, ''),
+                        ]
+                    ],
                 )
 
             Printer.table(table)
@@ -112,17 +178,329 @@ class HtbCmd(NobuCmd):
         except Exception as ex:
             Printer.err(str(ex))
 
+    def do_cache(self, line: str | None = None) -> bool:
+        try:
+            args: list[str] = line.split(' ')
+            service: HtbService = HtbService()
+
+            if args[0] == 'clear':
+                resource: str | None = args[1] if len(args) > 1 else None
+                service.invalidate(resource)
+                Printer.suc(
+                    f'{resource} cache cleared'
+                    if resource
+                    else 'cache cleared'
+                )
+
+            elif args[0] == 'stats':
+                stats: CacheStats = service.get_cache_stats()
+
+                for title, counters in [
+                    (
+                        'Whole cache',
+                        stats.model_dump(include=CacheStats.cache_fields),
+                    ),
+                    (
+                        'This session only',
+                        stats.model_dump(exclude=CacheStats.cache_fields),
+                    ),
+                ]:
+                    table: Table = Table(title=title)
+                    table.add_column(
+                        'Counter', header_style='b', justify='left'
+                    )
+                    table.add_column(
+                        'Value', header_style='b', justify='right'
+                    )
+
+                    for counter, value in counters.items():
+                        table.add_row(
+                            counter.replace('_', ' ').title(),
+                            f'{value:.2%}'
+                            if isinstance(value, float)
+                            else str(value),
+                        )
+
+                    Printer.table(table)
+
+            else:
+                Printer.err('invalid cache command')
+                return False
+
+        except Exception as ex:
+            Printer.err(str(ex))
+
+    def do_enrich(self, line: str | None = None) -> bool:
+        try:
+            args: list[str] = line.split(' ')
+            update: bool = '-u' in args
+
+            service: HtbService = HtbService()
+            identifiers: list[int] = []
+            for arg in args:
+                if not arg or arg == '-u':
+                    continue
+
+                machine: HtbMachine | None = service.get_machine(arg)
+                if not machine:
+                    Printer.err(f'machine {arg} not found')
+                    return False
+                identifiers.append(machine.id)
+
+            modules_by_machine, failures = service.enrich_machines(
+                identifiers or None, update=update
+            )
+            for machine_id, error in failures.items():
+                Printer.err(f'machine {machine_id} not enriched: {error}')
+
+            if not modules_by_machine and not failures:
+                Printer.inf(
+                    'academy modules already fetched, use -u to update'
+                )
+                return False
+
+            modules: set[int] = {
+                module_id
+                for module_ids in modules_by_machine.values()
+                for module_id in module_ids
+            }
+            Printer.suc(
+                f'{len(modules_by_machine)} machines enriched with '
+                f'{len(modules)} unique academy modules'
+            )
+
+        except Exception as ex:
+            Printer.err(str(ex))
+
+    def do_export(self, line: str | None = None) -> bool:
+        try:
+            args: list[str] = line.split(' ')
+            retired: bool | None = True if '-r' in args else None
+            file_format: str | None = (
+                args[args.index('-f') + 1] if '-f' in args else None
+            )
+            paths: list[str] = [
+                arg
+                for index, arg in enumerate(args)
+                if arg
+                and arg not in {'-f', '-r'}
+                and not (index and args[index - 1] == '-f')
+            ]
+
+            if not paths:
+                Printer.err('missing export file path')
+                return False
+
+            service: HtbService = HtbService()
+            count: int = service.export_machines(
+                Path(paths[0]), file_format=file_format, retired=retired
+            )
+
+            if not count:
+                Printer.war('no machines exported, try listing them first')
+                return False
+
+            Printer.suc(f'{count} machines exported to {paths[0]}')
+
+        except Exception as ex:
+            Printer.err(str(ex))
+
+    def do_machines(self, line: str | None = None) -> None:
+        try:
+            args: list[str] = line.split(' ')
+            update: bool = '-u' in args
+            retired: bool = '-r' in args
+            size: int = int(args[args.index('-s') + 1]) if '-s' in args else 5
+            sort: str | None = (
+                args[args.index('--sort') + 1] if '--sort' in args else None
+            )
+
+            service: HtbService = HtbService()
+            if '-q' in args or sort:
+                expression: list[str] = []
+                if '-q' in args:
+                    for arg in args[args.index('-q') + 1 :]:
+                        if arg in {'-r', '-s', '-u', '--sort'}:
+                            break
+                        expression.append(arg)
+
+                self.machines = service.query_machines(
+                    ' '.join(expression),
+                    sort=sort,
+                    size=size,
+                    retired=True if retired else None,
+                )
+                if not self.machines:
+                    Printer.war('no machines found, try listing them first')
+                    return
+
+                Printer.table(self._machines_table())
+                return
+
+            self.machines: list[HtbMachine | HtbMachineSlim] = []
+            with Printer.live(self._machines_table):
+                for machine in service.iter_machines(
+                    size=size, update=update, retired=retired
+                ):
+                    insort(self.machines, machine, key=lambda item: -item.id)
+
+        except Exception as ex:
+            Printer.err(str(ex))
+
+    def do_search(self, line: str | None = None) -> bool:
+        try:
+            args: list[str] = line.split(' ')
+            size: int = int(args[args.index('-s') + 1]) if '-s' in args else 20
+            terms: list[str] = []
+            for index, arg in enumerate(args):
+                if arg == '-s' or (index and args[index - 1] == '-s'):
+                    continue
+                terms.append(arg)
+
+            if not ''.join(terms):
+                Printer.err('missing search terms')
+                return False
+
+            service: HtbService = HtbService()
+            self.machines = service.search_machines(' '.join(terms), size=size)
+
+            if not self.machines:
+                Printer.war('no machines found, try listing them first')
+                return False
+
+            Printer.table(self._machines_table())
+
+        except Exception as ex:
+            Printer.err(str(ex))
+
+    def do_sync(self, line: str | None = None) -> bool:
+        try:
+            args: list[str] = line.split(' ')
+            update: bool = '-u' in args
+
+            context: NotionDatabase | NotionPage | None = (
+                NobuCmd.notion_context
+            )
+            if not context or not isinstance(context, NotionDatabase):
+                Printer.err('no Notion database in use, please select one:')
+                super().do_dbs()
+                return False
+
+            service: HtbService = HtbService()
+            if update:
+                for retired in [False, True]:
+                    for _ in service.iter_machines(
+                        size=sys.maxsize, update=True, retired=retired
+                    ):
+                        pass
+
+            changes: dict[str, list[str]] = NobuCmd.notion.sync_htb_machines(
+                context.identifier, partial(service.get_machine, fetch=False)
+            )
+            updated: dict[str, list[str]] = {
+                name: properties
+                for name, properties in changes.items()
+                if properties
+            }
+            for name, properties in updated.items():
+                Printer.suc(f'machine {name} updated: {", ".join(properties)}')
+
+            Printer.inf(
+                f'{len(updated)} pages updated, '
+                f'{len(changes) - len(updated)} unchanged in {context.title} '
+                'database'
+            )
+
+        except Exception as ex:
+            Printer.err(str(ex))
+
     def help_add(self) -> None:
         """
         Prints help menu for the add command.
         """
         help_text: str = """
-        [bold cyan]Usage:[/bold cyan] add [OPTIONS] [ID]
+        [bold cyan]Usage:[/bold cyan] add <ID|NAME>...
+
+        Add one or more machines to Notion database, by ID or name.
+        """
+        Printer.help(help_text)
+
+    def help_analytics(self) -> None:
+        """
+        Prints help menu for the analytics command.
+        """
+        help_text: str = """
+        [bold cyan]Usage:[/bold cyan] analytics [OPTIONS]
 
-        Add machine to Notion database.
+        Rank machines of the local catalog by community difficulty
+        votes, owns and rating, without any network call. By default it
+        lists the machines that play harder than their official
+        difficulty first.
 
         [bold cyan]Options:[/bold cyan]
-            -a          Add all active machines.
+            -r          Analyze only retired machines.
+            -s  int     Max size of machines to be printed. Default is 10.
+            --sort str  Metric to rank by: gap, owns, perceived, root or
+                        stars. Prefix it with "-" to sort descending.
+                        Default is -gap.
+        """
+        Printer.help(help_text)
+
+    def help_cache(self) -> None:
+        """
+        Prints help menu for the cache command.
+        """
+        help_text: str = """
+        [bold cyan]Usage:[/bold cyan] cache <COMMAND> [RESOURCE]
+
+        Manages cached HTB responses.
+
+        [bold cyan]Commands:[/bold cyan]
+            clear       Clear a resource. By default it clears the
+                        whole cache.
+            stats       Show the size and entry count of the whole
+                        cache, and how responses were served in this
+                        session only.
+
+        [bold cyan]Resources:[/bold cyan]
+            active      Active machines.
+            profiles    Machine profiles.
+            retired     Retired machines.
+        """
+        Printer.help(help_text)
+
+    def help_enrich(self) -> None:
+        """
+        Prints help menu for the enrich command.
+        """
+        help_text: str = """
+        [bold cyan]Usage:[/bold cyan] enrich [OPTIONS] [ID|NAME]...
+
+        Fetch the HTB Academy modules of machines in the local catalog.
+        By default it enriches every machine not enriched yet. Modules
+        shared by several machines are stored only once.
+
+        [bold cyan]Options:[/bold cyan]
+            -u          Fetch the modules of enriched machines again.
+        """
+        Printer.help(help_text)
+
+    def help_export(self) -> None:
+        """
+        Prints help menu for the export command.
+        """
+        help_text: str = """
+        [bold cyan]Usage:[/bold cyan] export [OPTIONS] <PATH>
+
+        Export machines of the local catalog to a columnar file, with
+        feedback counters, labels, makers and first bloods flattened
+        into typed columns. The format is taken from the file extension:
+        .arrow, .parquet or .jsonl. Arrow and Parquet files need
+        pyarrow.
+
+        [bold cyan]Options:[/bold cyan]
+            -f  str     File format: arrow, parquet or jsonl.
+            -r          Export only retired machines.
         """
         Printer.help(help_text)
 
@@ -137,8 +515,53 @@ class HtbCmd(NobuCmd):
         only active machines.
 
         [bold cyan]Options:[/bold cyan]
+            -q  str     Filter the local catalog, active and retired
+                        machines, without any network call. Conditions
+                        on machine fields are joined by "and", such as
+                        os=Linux and difficulty_text in (Hard, Insane)
+                        and stars>=4.5
             -r          List only retired machines.
             -s  int     Max size of machines to be printed. Default is 5.
-            -u          Force update results rather than getting from cache.
+            -u          Revalidate results with the server rather than
+                        getting them from cache.
+            --sort str  Sort the local catalog by a machine field, such
+                        as stars. Prefix it with "-" to sort descending.
+        """
+        Printer.help(help_text)
+
+    def help_search(self) -> None:
+        """
+        Prints help menu for the search command.
+        """
+        help_text: str = """
+        [bold cyan]Usage:[/bold cyan] search [OPTIONS] <TERMS>
+
+        Search machines by name, synopsis, labels, makers, OS and
+        difficulty in the local catalog, without any network call.
+        Machines are added to the catalog when they are listed.
+
+        [bold cyan]Options:[/bold cyan]
+            -s  int     Max size of machines to be printed. Default is 20.
+        """
+        Printer.help(help_text)
+
+    def help_sync(self) -> None:
+        """
+        Prints help menu for the sync command.
+        """
+        help_text: str = """
+        [bold cyan]Usage:[/bold cyan] sync [OPTIONS]
+
+        Sync the progress of the machines in the Notion database in use:
+        Status, User Owned, Root Owned and Rating, when the database has
+        them. Only properties changed since the last sync are written,
+        and Status never moves backwards. Machines are read from the
+        local catalog only, as of its last refresh, so progress made
+        since then is not synced without -u, and pages whose title is
+        not a machine of the catalog are skipped.
+
+        [bold cyan]Options:[/bold cyan]
+            -u          Refresh active and retired machines from the
+                        server before syncing.
         """
         Printer.help(help_text)
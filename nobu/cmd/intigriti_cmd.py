@@ -1,8 +1,19 @@
+import json
+import sys
+import threading
+from pathlib import Path
+from typing import Iterator
+
 from rich.table import Table
 
 from nobu.commons import Printer
 from nobu.core.intigriti import IntigritiService
-from nobu.core.intigriti.entities import IntigritiProgram, IntigritiProgramSlim
+from nobu.core.intigriti.entities import (
+    IntigritiDomain,
+    IntigritiProgram,
+    IntigritiProgramSlim,
+    IntigritiScopeMatch,
+)
 
 from .nobu_cmd import NobuCmd
 
@@ -19,6 +30,202 @@ class IntigritiCmd(NobuCmd):
         super().__init__('intigriti')
         self.programs: list[IntigritiProgramSlim | None] = None
 
+    def _print_scopes(
+        self,
+        results: Iterator[tuple[str, list[IntigritiScopeMatch]]],
+        output_path: str | None = None,
+    ) -> None:
+        """
+        Prints the domains covering each host, or writes them to a JSON
+        Lines file as they are found, one line per host in scope. A host
+        is in scope when a program has it in scope as a whole, not only
+        some paths of a URL.
+
+        :param results: An iterator over each host and its matching
+         domains.
+        :param output_path: JSON Lines file path. If None, matches are
+         printed as a table.
+        """
+        count: int = 0
+        in_scope: int = 0
+
+        if output_path:
+            path: Path = Path(output_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open('w', encoding='utf-8') as file:
+                for host, matches in results:
+                    count += 1
+                    if any(
+                        match.scope == 'in-scope' and not match.limited
+                        for match in matches
+                    ):
+                        in_scope += 1
+                        file.write(
+                            json.dumps({
+                                'host': host,
+                                'matches': [
+                                    match.model_dump() for match in matches
+                                ],
+                            })
+                            + '\n'
+                        )
+
+            Printer.suc(
+                f'{in_scope} of {count} hosts in scope, written to {path}'
+            )
+            return
+
+        table: Table = Table()
+        for column in ['Host', 'Program', 'Endpoint', 'Scope', 'Tier', 'Type']:
+            table.add_column(column, header_style='b', justify='left')
+
+        for host, matches in results:
+            count += 1
+            in_scope += any(
+                match.scope == 'in-scope' and not match.limited
+                for match in matches
+            )
+            for match in matches:
+                table.add_row(
+                    host,
+                    match.program_name,
+                    match.domain.endpoint,
+                    'path only' if match.limited else match.scope,
+                    match.domain.tier,
+                    match.domain.type,
+                )
+
+        if not table.row_count:
+            Printer.inf(f'no program has any of {count} hosts in scope')
+            return
+
+        Printer.table(table)
+        Printer.suc(f'{in_scope} of {count} hosts in scope')
+
+    def _warm_up(self) -> None:
+        """
+        Warms the default program listing, ignoring any error, as the
+        commands report them when they run.
+        """
+        try:
+            IntigritiService().warm_up()
+        except Exception:
+            pass
+
+    def postloop(self) -> None:
+        """
+        Cancels the pending prefetch of program details when the module
+        is left.
+        """
+        IntigritiService.cancel_prefetch()
+
+    def preloop(self) -> None:
+        """
+        Starts warming the default program listing in background when
+        the module is entered.
+        """
+        threading.Thread(target=self._warm_up, daemon=True).start()
+
+    def do_changes(self, line: str | None = None) -> None:
+        try:
+            args: list[str] = line.split(' ')
+            following: bool | None = True if '-f' in args else None
+            checks: int | None = self.get_option_value(args, '-c', int)
+
+            service: IntigritiService = IntigritiService()
+            checked, changes = service.detect_changes(
+                following=following, checks=10 if checks is None else checks
+            )
+
+            if not changes:
+                Printer.inf(f'no scope changes in {checked} programs checked')
+                return
+
+            table: Table = Table()
+            for column in ['Program', 'Change', 'Domain', 'Tier', 'Type']:
+                table.add_column(column, header_style='b', justify='left')
+
+            styles: dict[str, str] = {
+                'added': 'green',
+                'modified': 'yellow',
+                'removed': 'red',
+            }
+            for change in changes:
+                previous: IntigritiDomain | None = change.previous
+                fields: list[str] = [
+                    (
+                        f'{getattr(previous, field)} -> '
+                        f'{getattr(change.domain, field)}'
+                        if previous
+                        and getattr(previous, field)
+                        != getattr(change.domain, field)
+                        else getattr(change.domain, field)
+                    )
+                    for field in ['endpoint', 'tier', 'type']
+                ]
+                table.add_row(
+                    change.program_name,
+                    f'[{styles[change.change]}]{change.change}'
+                    f'[/{styles[change.change]}]',
+                    *fields,
+                )
+
+            Printer.table(table)
+            Printer.suc(
+                f'{len(changes)} scope changes in {checked} programs checked'
+            )
+
+        except Exception as ex:
+            Printer.err(str(ex))
+
+    def do_exit(self, line: str | None = None) -> None:
+        self.postloop()
+        super().do_exit(line)
+
+    def do_export(self, line: str | None = None) -> None:
+        try:
+            args: list[str] = line.split(' ')
+            following: bool | None = None if '-a' in args else True
+            identifier: int | None = (
+                int(args[args.index('-i') + 1]) if '-i' in args else None
+            )
+            update: bool = '-u' in args
+            paths: list[str] = [
+                arg
+                for index, arg in enumerate(args)
+                if arg
+                and not arg.startswith('-')
+                and not (index and args[index - 1] == '-i')
+            ]
+
+            if not paths:
+                Printer.err('missing export path')
+                return
+
+            program_id: str | None = None
+            if identifier is not None:
+                if not self.programs or not 0 < identifier <= len(
+                    self.programs
+                ):
+                    Printer.err('invalid program ID')
+                    return
+
+                program_id = self.programs[identifier - 1].id
+
+            service: IntigritiService = IntigritiService()
+            count, targets = service.export_scopes(
+                Path(paths[0]),
+                program_id=program_id,
+                following=following,
+                update=update,
+            )
+            Printer.suc(
+                f'{targets} targets of {count} programs exported to {paths[0]}'
+            )
+
+        except Exception as ex:
+            Printer.err(str(ex))
+
     def do_info(self, line: str | None = None) -> bool:
         try:
             if not self.programs:
@@ -26,6 +233,7 @@ class IntigritiCmd(NobuCmd):
                 self.programs = service.list_programs()
 
             args: list[str] = line.split(' ')
+            update: bool = '-u' in args
             identifier: str = args[-1]
             if identifier.isdigit():
                 identifier: int = int(identifier) - 1
@@ -41,7 +249,9 @@ class IntigritiCmd(NobuCmd):
 
             program_id: str = self.programs[identifier].id
             service: IntigritiService = IntigritiService()
-            program: IntigritiProgram = service.get_program(program_id)
+            program: IntigritiProgram = service.get_program(
+                program_id, update=update
+            )
 
             table = Table()
 
@@ -77,11 +287,17 @@ class IntigritiCmd(NobuCmd):
         try:
             args: list[str] = line.split(' ')
             following: bool = '-f' in args
-            limit: int | None = self.get_option_value(args, '-l', int)
+            limit: int | None = (
+                sys.maxsize
+                if '-a' in args
+                else self.get_option_value(args, '-l', int)
+            )
             match_status: int | None = self.get_option_value(args, '-ms', int)
             match_type: int | None = self.get_option_value(args, '-mt', int)
             offset: int | None = self.get_option_value(args, '-of', int)
             search: str | None = self.get_option_value(args, '-s', str)
+            update: bool = '-u' in args
+            fuzzy: bool = '-z' in args
 
             service: IntigritiService = IntigritiService()
             self.programs = service.list_programs(
@@ -91,6 +307,8 @@ class IntigritiCmd(NobuCmd):
                 match_type=match_type,
                 offset=offset,
                 search=search,
+                update=update,
+                fuzzy=fuzzy,
             )
 
             table: Table = Table()
@@ -120,17 +338,120 @@ class IntigritiCmd(NobuCmd):
                 )
 
             Printer.table(table)
+            service.prefetch_programs(self.programs)
         except Exception as ex:
             Printer.err(str(ex))
 
+    def do_scope_of(self, line: str | None = None) -> None:
+        try:
+            args: list[str] = line.split(' ')
+            following: bool | None = None if '-a' in args else True
+            update: bool = '-u' in args
+            input_path: str | None = (
+                args[args.index('-i') + 1] if '-i' in args else None
+            )
+            output_path: str | None = (
+                args[args.index('-o') + 1] if '-o' in args else None
+            )
+            hosts: list[str] = [
+                arg
+                for index, arg in enumerate(args)
+                if arg
+                and not arg.startswith('-')
+                and not (index and args[index - 1] in {'-i', '-o'})
+            ]
+
+            if not hosts and not input_path:
+                Printer.err('missing host')
+                return
+
+            service: IntigritiService = IntigritiService()
+            if not input_path:
+                self._print_scopes(
+                    service.lookup_scopes(
+                        hosts, following=following, update=update
+                    ),
+                    output_path,
+                )
+                return
+
+            with open(input_path, 'r', encoding='utf-8') as file:
+                self._print_scopes(
+                    service.lookup_scopes(
+                        file, following=following, update=update
+                    ),
+                    output_path,
+                )
+
+        except Exception as ex:
+            Printer.err(str(ex))
+
+    def help_changes(self) -> None:
+        """
+        Prints help menu for the changes command.
+        """
+        help_text = """
+        [bold cyan]Usage:[/bold cyan] changes [OPTIONS]
+
+        Refresh the program listing and print the domains added,
+        removed and modified since the last check. Details are fetched
+        only for programs whose listing changed, plus a few programs
+        checked the longest time ago, so every scope is checked again
+        over a few runs. The first run only takes the snapshots.
+        Programs that left the listing have their domains printed as
+        removed, unless only followed programs are checked.
+
+        [bold cyan]Options:[/bold cyan]
+            -c  int         Quantity of unchanged programs checked again.
+                            Default is 10.
+
+            -f              Check only programs that you're following.
+        """
+        Printer.help(help_text)
+
+    def help_export(self) -> None:
+        """
+        Prints help menu for the export command.
+        """
+        help_text = """
+        [bold cyan]Usage:[/bold cyan] export [OPTIONS] <PATH>
+
+        Export the scope of your followed programs for recon tools.
+        Endpoints are normalized into hosts, wildcards, URLs and CIDRs,
+        duplicates are dropped and overlapping IP ranges are merged.
+        A .jsonl path gets an object per target, with its program, tier
+        and type, so a target shared by several programs gets an object
+        for each. Any other path is a directory that gets a file per
+        target kind, split by scope, such as in-scope/hosts.txt and
+        out-of-scope/hosts.txt, with targets of every program merged.
+        Program details are read from the HTTP cache when possible.
+
+        [bold cyan]Options:[/bold cyan]
+            -a              Export every program, not only the ones
+                            you're following.
+
+            -i  int         Export only the program with this ID, as
+                            listed by the programs command.
+
+            -u              Fetch programs from Intigriti rather than
+                            getting them from cache.
+        """
+        Printer.help(help_text)
+
     def help_info(self) -> None:
         """
         Prints help menu for the info command.
         """
         help_text = """
-        [bold cyan]Usage:[/bold cyan] info <PROGRAM-ID>
+        [bold cyan]Usage:[/bold cyan] info [OPTIONS] <PROGRAM-ID>
 
-        Get program information.
+        Get program information. Details of the listed programs are
+        fetched in background once they are printed, followed programs
+        first, and kept in cache for 30 minutes.
+
+        [bold cyan]Options:[/bold cyan]
+            -u              Fetch details from Intigriti rather than
+                            getting them from cache.
         """
         Printer.help(help_text)
 
@@ -144,9 +465,12 @@ class IntigritiCmd(NobuCmd):
         List all Intigriti available programs for your user.
 
         [bold cyan]Options:[/bold cyan]
+            -a              Return every program, ignoring the limit.
+
             -f              Return only programs that you're following.
 
-            -l  int         Limit of programs to be returned.
+            -l  int         Limit of programs to be returned. Default is
+                            50.
 
             -ms int         Return programs with specified status ID.
                             [bold green]3[/bold green] [dim]Open[/dim]
@@ -159,6 +483,44 @@ class IntigritiCmd(NobuCmd):
 
             -of int         Get programs starting by the specified offset.
 
-            -s  string      Filter by specified name.
+            -s  string      Search every program whose name or handle
+                            has words starting with the specified terms,
+                            best matches first.
+
+            -u              Fetch programs from Intigriti rather than
+                            getting them from cache.
+
+            -z              Also match words close to the search terms,
+                            such as misspelled names.
+        """
+        Printer.help(help_text)
+
+    def help_scope_of(self) -> None:
+        """
+        Prints help menu for the scope_of command.
+        """
+        help_text = """
+        [bold cyan]Usage:[/bold cyan] scope_of [OPTIONS] [HOST|URL]...
+
+        Find which programs have hosts in scope, and at which tier, from
+        an index of the scopes of your followed programs. Wildcards such
+        as *.example.com cover every subdomain, and addresses are looked
+        up in IP ranges. A host out of scope overrides the wildcards and
+        ranges in scope of its program, and URLs only put their paths in
+        scope, not the whole host. The index is built once from cached
+        program details and kept for 30 minutes.
+
+        [bold cyan]Options:[/bold cyan]
+            -a              Look up every program, not only the ones
+                            you're following.
+
+            -i  path        Read hosts from a file, one per line, as they
+                            are looked up.
+
+            -o  path        Write hosts in scope to a JSON Lines file
+                            rather than printing them.
+
+            -u              Build the index again from Intigriti rather
+                            than from cache.
         """
         Printer.help(help_text)
@@ -72,7 +72,10 @@ class NobuCmd(BaseCmd):
 
     def do_dbs(self, line: str | None = None) -> None:
         try:
-            dbs: list[NotionDatabase] = self.notion.list_dbs()
+            args: list[str] = line.split(' ')
+            dbs: list[NotionDatabase] = self.notion.list_dbs(
+                update='-u' in args
+            )
             table: Table = Table()
             table.add_column('ID', header_style='b', justify='left')
             table.add_column('Title', header_style='b', justify='full')
@@ -101,7 +104,10 @@ class NobuCmd(BaseCmd):
 
     def do_pages(self, line: str | None = None) -> None:
         try:
-            pages: list[NotionPage] = self.notion.list_pages()
+            args: list[str] = line.split(' ')
+            pages: list[NotionPage] = self.notion.list_pages(
+                update='-u' in args
+            )
             table: Table = Table()
             table.add_column('ID', header_style='b', justify='left')
             table.add_column('Title', header_style='b', justify='full')
@@ -116,9 +122,14 @@ class NobuCmd(BaseCmd):
         try:
             args: list[str] = line.split(' ')
 
-            identifier: str = args[0]
-            pages: list[NotionPage] = self.notion.list_pages()
-            databases: list[NotionDatabase] = self.notion.list_dbs()
+            update: bool = '-u' in args
+            identifier: str = next(
+                (arg for arg in args if arg and arg != '-u'), ''
+            )
+            pages: list[NotionPage] = self.notion.list_pages(update=update)
+            databases: list[NotionDatabase] = self.notion.list_dbs(
+                update=update
+            )
 
             for page in pages:
                 if identifier == page.identifier:
@@ -164,9 +175,15 @@ class NobuCmd(BaseCmd):
         Prints help menu for the dbs command.
         """
         help_text: str = """
-        [bold cyan]Usage:[/bold cyan] dbs
+        [bold cyan]Usage:[/bold cyan] dbs [OPTIONS]
 
         Lists all notion databases that is integrated with Nobu.
+        Results are kept in cache for 1 minute, and until a database
+        or a page is created.
+
+        [bold cyan]Options:[/bold cyan]
+            -u          Fetch databases from Notion rather than getting
+                        them from cache.
         """
         Printer.help(help_text)
 
@@ -197,9 +214,15 @@ class NobuCmd(BaseCmd):
         Prints help menu for the notion_pages command.
         """
         help_text: str = """
-        [bold cyan]Usage:[/bold cyan] pages
+        [bold cyan]Usage:[/bold cyan] pages [OPTIONS]
 
         Lists all notion pages that is integrated with Nobu.
+        Results are kept in cache for 1 minute, and until a database
+        or a page is created.
+
+        [bold cyan]Options:[/bold cyan]
+            -u          Fetch pages from Notion rather than getting
+                        them from cache.
         """
         Printer.help(help_text)
 
@@ -208,8 +231,12 @@ class NobuCmd(BaseCmd):
         Prints help menu for the use command.
         """
         help_text = """
-        [bold cyan]Usage:[/bold cyan] use <id>
+        [bold cyan]Usage:[/bold cyan] use [OPTIONS] <id>
 
         Interacts with a database or page by its ID.
+
+        [bold cyan]Options:[/bold cyan]
+            -u          Fetch databases and pages from Notion rather
+                        than getting them from cache.
         """
         Printer.help(help_text)
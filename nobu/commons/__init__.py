@@ -1,5 +1,15 @@
 from .bearer_auth import BearerAuth
 from .dict_utils import DictUtils
+from .prefetcher import Prefetcher
 from .printer import Printer
+from .sqlite_store import SqliteStore
+from .stale_cache import StaleCache
 
-__all__ = ['BearerAuth', 'DictUtils', 'Printer']
+__all__ = [
+    'BearerAuth',
+    'DictUtils',
+    'Prefetcher',
+    'Printer',
+    'SqliteStore',
+    'StaleCache',
+]
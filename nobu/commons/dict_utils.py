@@ -1,3 +1,5 @@
+import hashlib
+import json
 from typing import Any
 
 
@@ -21,3 +23,9 @@ class DictUtils:
                         return result
 
         return None
+
+    @classmethod
+    def get_digest(cls, value: Any) -> str:
+        return hashlib.sha256(
+            json.dumps(value, sort_keys=True).encode()
+        ).hexdigest()
@@ -0,0 +1,52 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable
+
+
+class Prefetcher:
+    """
+    Runs loads in background, a bounded number at a time, in the order
+    they are submitted. Loads still waiting to run can be cancelled at
+    any time, so work nobody will need is dropped, while the loads
+    already running are left to finish.
+    """
+
+    def __init__(self, max_workers: int = 4) -> None:
+        """
+        Initializes Prefetcher object attributes.
+
+        :param max_workers: Maximum number of loads running at the same
+         time. Default is 4.
+        """
+        self.max_workers: int = max_workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock: threading.Lock = threading.Lock()
+
+    def cancel(self) -> None:
+        """
+        Cancels every load that has not started yet.
+        """
+        with self._lock:
+            executor: ThreadPoolExecutor | None = self._executor
+            self._executor = None
+
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, loads: Iterable[Callable[[], Any]]) -> None:
+        """
+        Submits loads to run in background, after the ones already
+        submitted. Errors of a load are ignored, as it is run again by
+        whoever needs its value.
+
+        :param loads: Callables loading a value each.
+        """
+        with self._lock:
+            if not self._executor:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=self.__class__.__name__,
+                )
+
+            for load in loads:
+                self._executor.submit(load)
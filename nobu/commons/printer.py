@@ -1,8 +1,9 @@
 import sys
 import textwrap
-from typing import Any
+from typing import Any, Callable
 
-from rich.console import Console
+from rich.console import Console, RenderableType
+from rich.live import Live
 from rich.markup import escape
 from rich.table import Table
 from rich.text import Text
@@ -41,6 +42,23 @@ class Printer:
         inf_prefix: Text = Text('inf:', style='bold cyan')
         Printer.console_stdout.print(inf_prefix, message, highlight=False)
 
+    @staticmethod
+    def live(get_renderable: Callable[[], RenderableType]) -> Live:
+        """
+        Creates a live display that re-renders its content while it is
+        being filled, leaving the final render printed on exit.
+
+        :param get_renderable: Callable returning the content to print
+         on each refresh.
+
+        :return: The live display, to be used as a context manager.
+        """
+        return Live(
+            get_renderable=get_renderable,
+            console=Printer.console_stdout,
+            auto_refresh=True,
+        )
+
     @staticmethod
     def sanitize(message: str) -> str:
         """
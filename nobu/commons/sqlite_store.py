@@ -0,0 +1,52 @@
+import sqlite3
+import threading
+from pathlib import Path
+
+
+class SqliteStore:
+    """
+    Base of the local stores kept in a SQLite database. A single
+    connection, in autocommit mode, is shared across threads, so every
+    access holds the store lock and transactions are explicit. Stores
+    create their tables in ``create_tables``.
+    """
+
+    journal_mode: str | None = 'WAL'
+    """Journal mode of the database. If None, the default one is kept."""
+
+    def __init__(self, db_path: Path) -> None:
+        """
+        Initializes SqliteStore object attributes and opens the database
+        connection.
+
+        :param db_path: Path of the SQLite database file.
+        """
+        self.db_path: Path = db_path
+        self._lock: threading.Lock = threading.Lock()
+        self._connection: sqlite3.Connection = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Opens a connection to the database, creating the file and its
+        tables when missing.
+
+        :return: Database connection.
+        """
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        connection: sqlite3.Connection = sqlite3.connect(
+            self.db_path,
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        if self.journal_mode:
+            connection.execute(f'PRAGMA journal_mode={self.journal_mode}')
+        self.create_tables(connection)
+        return connection
+
+    def create_tables(self, connection: sqlite3.Connection) -> None:
+        """
+        Creates the tables of the store if they do not exist.
+
+        :param connection: Database connection.
+        """
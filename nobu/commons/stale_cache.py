@@ -0,0 +1,212 @@
+import threading
+import time
+from concurrent.futures import Future
+from datetime import timedelta
+from typing import Any, Callable, Hashable
+
+
+class StaleCache:
+    """
+    In-memory cache of values produced by loader callables. Values older
+    than their time to live are still served during a stale window,
+    while a background thread loads them again, so only missing or too
+    old values block the caller. A value is never loaded twice at the
+    same time: callers of a value being loaded wait for that load,
+    except updates, which only wait for another update. A load replaced
+    by an update does not cache its value.
+
+    Loaders are called with whether the load is an update, that is a
+    load of a value expired or asked to be loaded again, so they can
+    bypass any cache of their own, which may still hold the old value.
+    """
+
+    def __init__(
+        self,
+        ttl: timedelta = timedelta(minutes=5),
+        stale_ttl: timedelta = timedelta(days=1),
+    ) -> None:
+        """
+        Initializes StaleCache object attributes.
+
+        :param ttl: Time during which a value is fresh. Default is 5
+         minutes.
+        :param stale_ttl: Time after expiration during which a value is
+         still served while being refreshed. Default is 1 day.
+        """
+        self.ttl: float = ttl.total_seconds()
+        self.stale_ttl: float = stale_ttl.total_seconds()
+        self._entries: dict[Hashable, tuple[float, Any]] = {}
+        self._loading: dict[Hashable, tuple[Future, bool]] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def _load(
+        self,
+        key: Hashable,
+        loader: Callable[[bool], Any],
+        update: bool = False,
+    ) -> Future:
+        """
+        Loads a value in a background thread, unless it is already
+        being loaded. An update only joins a load that is an update
+        itself, so it never gets a value loaded before it was asked.
+
+        :param key: Key of the value.
+        :param loader: Callable returning the value, given whether the
+         load is an update.
+        :param update: Whether the load is an update. Default is False.
+
+        :return: Future of the loaded value.
+        """
+        with self._lock:
+            loading: tuple[Future, bool] | None = self._loading.get(key)
+            if loading and (loading[1] or not update):
+                return loading[0]
+
+            future: Future = Future()
+            self._loading[key] = (future, update)
+
+        threading.Thread(
+            target=self._run, args=(key, loader, future, update), daemon=True
+        ).start()
+        return future
+
+    def _run(
+        self,
+        key: Hashable,
+        loader: Callable[[bool], Any],
+        future: Future,
+        update: bool = False,
+    ) -> None:
+        """
+        Loads a value in the calling thread and caches it, setting the
+        result of its load.
+
+        :param key: Key of the value.
+        :param loader: Callable returning the value, given whether the
+         load is an update.
+        :param future: Future of the loaded value.
+        :param update: Whether the load is an update. Default is False.
+        """
+        try:
+            value: Any = loader(update)
+            with self._lock:
+                if self._is_loading(key, future):
+                    self._entries[key] = (time.monotonic(), value)
+            future.set_result(value)
+        except Exception as ex:
+            future.set_exception(ex)
+        finally:
+            with self._lock:
+                if self._is_loading(key, future):
+                    self._loading.pop(key)
+
+    def _is_loading(self, key: Hashable, future: Future) -> bool:
+        """
+        Checks if a load is still the current one of its value, as it
+        may have been replaced by an update. The lock must be held.
+
+        :param key: Key of the value.
+        :param future: Future of the load.
+
+        :return: True if the load is the current one, False otherwise.
+        """
+        loading: tuple[Future, bool] | None = self._loading.get(key)
+        return loading is not None and loading[0] is future
+
+    def _get_entry(self, key: Hashable) -> tuple[float, Any] | None:
+        """
+        Gets the age and the value of a cached entry.
+
+        :param key: Key of the value.
+
+        :return: Seconds since the value was loaded and the value, or
+         None if it is not cached.
+        """
+        with self._lock:
+            entry: tuple[float, Any] | None = self._entries.get(key)
+
+        return (
+            None if entry is None else (time.monotonic() - entry[0], entry[1])
+        )
+
+    def clear(self) -> None:
+        """
+        Removes every cached value.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def fill(self, key: Hashable, loader: Callable[[bool], Any]) -> None:
+        """
+        Loads a value in the calling thread and caches it, unless it is
+        fresh or already being loaded, so worker pools bound how many
+        loads run at the same time. An expired value is updated. A
+        failed load is not raised, as the value is loaded again by
+        whoever needs it.
+
+        :param key: Key of the value.
+        :param loader: Callable returning the value, given whether the
+         load is an update.
+        """
+        entry: tuple[float, Any] | None = self._get_entry(key)
+        if entry and entry[0] < self.ttl:
+            return
+
+        update: bool = entry is not None
+        with self._lock:
+            if key in self._loading:
+                return
+
+            future: Future = Future()
+            self._loading[key] = (future, update)
+
+        self._run(key, loader, future, update)
+
+    def get(
+        self,
+        key: Hashable,
+        loader: Callable[[bool], Any],
+        update: bool = False,
+    ) -> Any:
+        """
+        Gets a value, serving it from the cache while it is fresh or
+        stale. A stale value is updated in background, and a value too
+        old is updated in the calling thread.
+
+        :param key: Key of the value.
+        :param loader: Callable returning the value, given whether the
+         load is an update.
+        :param update: Load the value again and wait for it, rather
+         than getting it from the cache.
+
+        :return: The value.
+
+        :raise Exception: When the value had to be loaded and the
+         loader failed.
+        """
+        entry: tuple[float, Any] | None = self._get_entry(key)
+        if entry and not update:
+            age, value = entry
+            if age < self.ttl:
+                return value
+
+            if age < self.ttl + self.stale_ttl:
+                self._load(key, loader, update=True)
+                return value
+
+        return self._load(
+            key, loader, update=update or entry is not None
+        ).result()
+
+    def warm(self, key: Hashable, loader: Callable[[bool], Any]) -> None:
+        """
+        Loads a value in background, unless it is fresh. An expired
+        value is updated.
+
+        :param key: Key of the value.
+        :param loader: Callable returning the value, given whether the
+         load is an update.
+        """
+        entry: tuple[float, Any] | None = self._get_entry(key)
+        if not entry or entry[0] >= self.ttl:
+            self._load(key, loader, update=entry is not None)
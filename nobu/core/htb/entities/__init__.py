@@ -1,4 +1,6 @@
 from .htb_machine import HtbMachine
+from .htb_machine_slim import HtbMachineSlim
+from .htb_machine_stats import HtbMachineStats
 from .htb_user import HtbUser
 
-__all__ = ['HtbMachine', 'HtbUser']
+__all__ = ['HtbMachine', 'HtbMachineSlim', 'HtbMachineStats', 'HtbUser']
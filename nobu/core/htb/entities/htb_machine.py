@@ -1,6 +1,7 @@
 from datetime import datetime
+from typing import Any
 
-from pydantic import AliasChoices, BaseModel, Field
+from pydantic import AliasChoices, BaseModel, Field, model_validator
 
 from .htb_academy_module import HtbAcademyModule
 from .htb_feedback import HtbFeedback
@@ -167,6 +168,27 @@ class HtbMachine(BaseModel):
     user_owns_count: int | None = None
     """Total users that already got user flag."""
 
+    @model_validator(mode='before')
+    @classmethod
+    def fold_makers(cls, data: Any) -> Any:
+        """
+        Folds the ``maker`` and ``maker2`` users of API payloads into
+        the makers list, so a whole page can be validated at once.
+
+        :param data: Raw machine payload.
+
+        :return: The payload with its makers list.
+        """
+        if isinstance(data, dict) and data.get('makers') is None:
+            data: dict[str, Any] = {
+                **data,
+                'makers': [
+                    data[key] for key in ['maker', 'maker2'] if data.get(key)
+                ],
+            }
+
+        return data
+
     def __gt__(self, other: 'HtbMachine') -> bool:
         """
         Overrides the default way to compare if a machine is greater
@@ -0,0 +1,161 @@
+import json
+import zlib
+from datetime import datetime
+from typing import Any
+
+from .htb_machine import HtbMachine
+
+
+class HtbMachineSlim:
+    """
+    Compact projection of an HTB machine, holding only the fields used
+    by listings and indexes along with its compressed raw record. The
+    full machine is hydrated from that record on demand. Projections
+    can be serialized to bytes, so they are rebuilt without decoding
+    or validating the record again. Serialized projections carry a
+    version, so projections of an older layout are detected and built
+    again from their record.
+    """
+
+    version: int = 1
+    """Version of the serialized projection, bumped when fields change."""
+
+    fields: tuple[str, ...] = (
+        'active',
+        'auth_user_in_root_owns',
+        'auth_user_in_user_owns',
+        'difficulty',
+        'difficulty_text',
+        'free',
+        'id',
+        'is_completed',
+        'is_todo',
+        'name',
+        'os',
+        'points',
+        'release',
+        'retired',
+        'root_owns_count',
+        'stars',
+        'user_owns_count',
+    )
+    """Fields kept in the projection."""
+
+    __slots__ = (*fields, '_record')
+
+    active: bool | None
+    auth_user_in_root_owns: bool | None
+    auth_user_in_user_owns: bool | None
+    difficulty: int | None
+    difficulty_text: str | None
+    free: bool | None
+    id: int
+    is_completed: bool | None
+    is_todo: bool | None
+    name: str
+    os: str | None
+    points: int | None
+    release: datetime | None
+    retired: int | None
+    root_owns_count: int | None
+    stars: float | None
+    user_owns_count: int | None
+
+    def __init__(self, machine: HtbMachine, record: dict[str, Any]) -> None:
+        """
+        Initializes HtbMachineSlim object attributes.
+
+        :param machine: Validated machine.
+        :param record: Raw machine record the machine was parsed from.
+        """
+        for field in self.fields:
+            setattr(self, field, getattr(machine, field))
+
+        self._record: bytes = zlib.compress(json.dumps(record).encode())
+
+    def __getattr__(self, name: str) -> Any:
+        """
+        Gets a machine field left out of the projection, hydrating the
+        full machine to read it.
+
+        :param name: Field name.
+
+        :return: The field value.
+
+        :raise AttributeError: When the field does not exist.
+        """
+        if name in HtbMachine.model_fields:
+            return getattr(self.hydrate(), name)
+
+        raise AttributeError(
+            f'{self.__class__.__name__} object has no attribute {name}'
+        )
+
+    def __gt__(self, other: 'HtbMachineSlim') -> bool:
+        """
+        Overrides the default way to compare if a machine is greater
+        than another based on its ID.
+
+        :param: Machine to be compared.
+
+        :return: True if the current object machine ID is greater than
+         other machine ID, false otherwise.
+        """
+        return self.id > other.id
+
+    def hydrate(self) -> HtbMachine:
+        """
+        Builds the full machine from its raw record.
+
+        :return: The machine object.
+        """
+        return HtbMachine.model_validate_json(zlib.decompress(self._record))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'HtbMachineSlim':
+        """
+        Rebuilds a projection serialized by ``to_bytes``, without
+        decoding or validating its raw record.
+
+        :param data: Serialized projection.
+
+        :return: The slim machine object.
+
+        :raise ValueError: When the projection was serialized with
+         another version.
+        """
+        header, _, record = bytes(data).partition(b'\n')
+        try:
+            version, values = json.loads(header)
+        except (TypeError, ValueError):
+            version, values = None, {}
+
+        if version != cls.version:
+            raise ValueError(f'unsupported slim machine version {version}')
+
+        machine: HtbMachineSlim = cls.__new__(cls)
+        for field in cls.fields:
+            setattr(machine, field, values[field])
+
+        if machine.release is not None:
+            machine.release = datetime.fromisoformat(machine.release)
+        machine._record = record
+
+        return machine
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializes the version and fields of the projection as a JSON
+        line, followed by its compressed raw record.
+
+        :return: Serialized projection.
+        """
+        values: dict[str, Any] = {
+            field: getattr(self, field) for field in self.fields
+        }
+        if self.release is not None:
+            values['release'] = self.release.isoformat()
+
+        return (
+            json.dumps([self.version, values]).encode() + b'\n' + self._record
+        )
@@ -0,0 +1,40 @@
+from pydantic import BaseModel
+
+
+class HtbMachineStats(BaseModel):
+    """Represents the community difficulty analytics of a machine."""
+
+    id: int
+    """Unique identifier of the machine."""
+
+    name: str
+    """Name of the machine."""
+
+    difficulty_text: str | None = None
+    """Official difficulty rate of the machine in a text format."""
+
+    votes: int
+    """Total community difficulty votes."""
+
+    perceived_difficulty: float | None = None
+    """Mean community difficulty vote, from 1 (piece of cake) to 10
+    (brainfuck)."""
+
+    difficulty_gap: float | None = None
+    """Perceived difficulty minus the official one, on the same scale.
+    Positive values mean the machine plays harder than rated."""
+
+    gap_percentile: float | None = None
+    """Percentile of the difficulty gap across the catalog."""
+
+    owns_per_day: float | None = None
+    """Mean user owns per day since release."""
+
+    owns_percentile: float | None = None
+    """Percentile of the owns per day across the catalog."""
+
+    root_ratio: float | None = None
+    """Share of user owns that went on to own root."""
+
+    stars: float | None = None
+    """Machine rate."""
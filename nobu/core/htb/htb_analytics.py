@@ -0,0 +1,200 @@
+from datetime import datetime, timezone
+from typing import Any
+
+import numpy as np
+
+from .entities import HtbMachineStats
+from .entities.htb_feedback import HtbFeedback
+
+
+class HtbAnalytics:
+    """
+    Community difficulty analytics over raw machine records. Votes,
+    rates, owns and release dates are loaded into arrays once, and every
+    metric is computed for the whole catalog in a single vectorized
+    pass.
+
+    Difficulty votes are weighted from 1 (piece of cake) to 10
+    (brainfuck), and official difficulties are placed on the same scale
+    as Easy 3, Medium 5, Hard 7 and Insane 9.
+    """
+
+    counters: tuple[str, ...] = (
+        'counter_cake',
+        'counter_very_easy',
+        'counter_easy',
+        'counter_too_easy',
+        'counter_medium',
+        'counter_bit_hard',
+        'counter_hard',
+        'counter_too_hard',
+        'counter_ex_hard',
+        'counter_brain_fuck',
+    )
+    """Feedback counters, from the easiest vote to the hardest one."""
+
+    official_difficulties: dict[str, float] = {
+        'easy': 3.0,
+        'medium': 5.0,
+        'hard': 7.0,
+        'insane': 9.0,
+    }
+    """Official difficulties placed on the vote scale."""
+
+    metrics: dict[str, str] = {
+        'gap': 'difficulty_gap',
+        'owns': 'owns_per_day',
+        'perceived': 'perceived_difficulty',
+        'root': 'root_ratio',
+        'stars': 'stars',
+    }
+    """Metrics machines can be ranked by."""
+
+    def __init__(
+        self, records: list[dict[str, Any]], now: datetime | None = None
+    ) -> None:
+        """
+        Initializes HtbAnalytics object attributes, loading the records
+        into arrays and computing every metric.
+
+        :param records: Raw machine records.
+        :param now: Reference time of the owns per day rate. Default is
+         the current time.
+        """
+        aliases: list[str] = [
+            HtbFeedback.model_fields[counter].alias
+            for counter in self.counters
+        ]
+        timestamp: float = (now or datetime.now(timezone.utc)).timestamp()
+
+        self.records: list[dict[str, Any]] = records
+        size: int = len(records)
+        votes: np.ndarray = np.zeros((size, len(aliases)), dtype=np.int64)
+        official: np.ndarray = np.full(size, np.nan)
+        stars: np.ndarray = np.full(size, np.nan)
+        user_owns: np.ndarray = np.zeros(size)
+        root_owns: np.ndarray = np.zeros(size)
+        released: np.ndarray = np.full(size, np.nan)
+
+        for index, record in enumerate(records):
+            feedback: dict[str, int] = record.get('feedbackForChart') or {}
+            votes[index] = [feedback.get(alias) or 0 for alias in aliases]
+            official[index] = self.official_difficulties.get(
+                (record.get('difficultyText') or '').lower(), np.nan
+            )
+            stars[index] = record.get('star', record.get('stars')) or np.nan
+            user_owns[index] = record.get('user_owns_count') or 0
+            root_owns[index] = record.get('root_owns_count') or 0
+            if record.get('release'):
+                released[index] = datetime.fromisoformat(
+                    record['release']
+                ).timestamp()
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.votes: np.ndarray = votes.sum(axis=1)
+            self.perceived_difficulty: np.ndarray = np.where(
+                self.votes > 0,
+                votes @ np.arange(1, len(aliases) + 1) / self.votes,
+                np.nan,
+            )
+            self.difficulty_gap: np.ndarray = (
+                self.perceived_difficulty - official
+            )
+            self.owns_per_day: np.ndarray = user_owns / np.maximum(
+                (timestamp - released) / 86400, 1
+            )
+            self.root_ratio: np.ndarray = np.where(
+                user_owns > 0, root_owns / user_owns, np.nan
+            )
+
+        self.stars: np.ndarray = stars
+        self.gap_percentile: np.ndarray = self._percentiles(
+            self.difficulty_gap
+        )
+        self.owns_percentile: np.ndarray = self._percentiles(self.owns_per_day)
+
+    @staticmethod
+    def _percentiles(values: np.ndarray) -> np.ndarray:
+        """
+        Computes the percentile rank of each value, ignoring missing
+        ones. Tied values share the average of their ranks.
+
+        :param values: Metric values, with NaN for missing ones.
+
+        :return: Percentile ranks from 0 to 100, with NaN for missing
+         values.
+        """
+        percentiles: np.ndarray = np.full(values.shape, np.nan)
+        valid: np.ndarray = ~np.isnan(values)
+        count: int = int(valid.sum())
+        if count:
+            present: np.ndarray = values[valid]
+            ordered: np.ndarray = np.sort(present)
+            ranks: np.ndarray = (
+                np.searchsorted(ordered, present, side='left')
+                + np.searchsorted(ordered, present, side='right')
+                - 1
+            ) / 2
+            percentiles[valid] = ranks * 100 / max(count - 1, 1)
+
+        return percentiles
+
+    @staticmethod
+    def _to_float(value: np.floating) -> float | None:
+        """
+        Converts an array value to a float.
+
+        :param value: Array value.
+
+        :return: The float, or None if the value is missing.
+        """
+        return None if np.isnan(value) else round(float(value), 2)
+
+    def rank(
+        self, metric: str = '-gap', size: int | None = None
+    ) -> list[HtbMachineStats]:
+        """
+        Ranks machines by a metric, leaving the ones without a value at
+        the end.
+
+        :param metric: Metric to rank by, prefixed with "-" for a
+         descending order. Default is the descending difficulty gap,
+         which lists machines easy on paper but hard in practice first.
+        :param size: Maximum quantity of machines. If None, all machines
+         are returned.
+
+        :return: List of machine statistics.
+
+        :raise ValueError: When the metric is unknown.
+        """
+        name: str = metric.removeprefix('-')
+        if name not in self.metrics:
+            raise ValueError(
+                f'unknown metric {name}, expected one of: '
+                f'{", ".join(self.metrics)}'
+            )
+
+        values: np.ndarray = getattr(self, self.metrics[name])
+        order: np.ndarray = np.argsort(
+            -values if metric.startswith('-') else values, kind='stable'
+        )[:size]
+
+        return [
+            HtbMachineStats(
+                id=self.records[index]['id'],
+                name=self.records[index].get('name')
+                or self.records[index].get('value'),
+                difficulty_text=self.records[index].get('difficultyText'),
+                votes=int(self.votes[index]),
+                perceived_difficulty=self._to_float(
+                    self.perceived_difficulty[index]
+                ),
+                difficulty_gap=self._to_float(self.difficulty_gap[index]),
+                gap_percentile=self._to_float(self.gap_percentile[index]),
+                owns_per_day=self._to_float(self.owns_per_day[index]),
+                owns_percentile=self._to_float(self.owns_percentile[index]),
+                root_ratio=self._to_float(self.root_ratio[index]),
+                stars=self._to_float(self.stars[index]),
+            )
+            for index in order
+        ]
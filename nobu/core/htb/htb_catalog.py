@@ -0,0 +1,503 @@
+import json
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Iterator
+
+from nobu.commons import SqliteStore
+
+
+class HtbCatalog(SqliteStore):
+    """
+    Local store of raw HTB machine records, used to avoid downloading
+    the whole catalog on every listing. Records are also indexed in an
+    FTS5 table, so machines can be searched without any network call.
+    Each record may carry the serialized slim projection of its parsed
+    machine, written along with the record, so listings can skip
+    decoding and validating it. Academy modules of enriched machines
+    are stored once per module. Records fetched one by one, rather than
+    from a listing, are flagged as not synced, so listing syncs do not
+    take them as already synced.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        """
+        Initializes HtbCatalog object attributes, creates its tables if
+        they do not exist and rebuilds the full-text index when it is
+        out of sync.
+
+        :param db_path: Path of the SQLite database file.
+        """
+        super().__init__(db_path)
+
+        indexed: int = self._connection.execute(
+            'SELECT COUNT(*) FROM machines_fts'
+        ).fetchone()[0]
+        stored: int = self._connection.execute(
+            'SELECT COUNT(*) FROM machines'
+        ).fetchone()[0]
+        if indexed != stored:
+            self._reindex()
+
+    def create_tables(self, connection: sqlite3.Connection) -> None:
+        """
+        Creates the tables of the catalog if they do not exist, adding
+        the columns missing from older databases.
+
+        :param connection: Database connection.
+        """
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS machines ('
+            '    id INTEGER PRIMARY KEY,'
+            '    name TEXT NOT NULL,'
+            '    retired INTEGER NOT NULL,'
+            '    release TEXT,'
+            '    data TEXT NOT NULL,'
+            '    slim BLOB,'
+            '    synced INTEGER NOT NULL DEFAULT 1'
+            ')'
+        )
+        columns: set[str] = {
+            row[1] for row in connection.execute('PRAGMA table_info(machines)')
+        }
+        if 'slim' not in columns:
+            connection.execute('ALTER TABLE machines ADD COLUMN slim BLOB')
+        if 'synced' not in columns:
+            connection.execute(
+                'ALTER TABLE machines ADD COLUMN '
+                'synced INTEGER NOT NULL DEFAULT 1'
+            )
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS machines_retired_idx '
+            'ON machines(retired, id)'
+        )
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS machines_name_idx '
+            'ON machines(name COLLATE NOCASE)'
+        )
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS academy_modules ('
+            '    id INTEGER PRIMARY KEY,'
+            '    data TEXT NOT NULL'
+            ')'
+        )
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS machine_modules ('
+            '    machine_id INTEGER PRIMARY KEY,'
+            '    module_ids TEXT NOT NULL'
+            ')'
+        )
+        connection.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS machines_fts USING fts5('
+            '    name, synopsis, labels, makers, os, difficulty_text,'
+            "    prefix='2 3'"
+            ')'
+        )
+
+    @staticmethod
+    def _to_document(record: dict[str, Any]) -> tuple[Any, ...]:
+        """
+        Extracts the searchable fields of a machine record.
+
+        :param record: Raw machine record.
+
+        :return: Row of the full-text index, starting with the machine
+         identifier.
+        """
+        makers: list[str] = [
+            maker.get('name') or maker.get('value') or ''
+            for maker in [record.get('maker'), record.get('maker2')]
+            if maker
+        ]
+        labels: list[str] = [
+            label.get('name') or '' for label in record.get('labels') or []
+        ]
+
+        return (
+            record['id'],
+            record.get('name') or record.get('value'),
+            record.get('synopsis') or '',
+            ' '.join(labels),
+            ' '.join(makers),
+            record.get('os') or '',
+            record.get('difficultyText') or '',
+        )
+
+    def _reindex(self) -> None:
+        """
+        Rebuilds the full-text index from all stored records.
+        """
+        rows: list[tuple[str]] = self._connection.execute(
+            'SELECT data FROM machines'
+        ).fetchall()
+
+        self._connection.execute('BEGIN IMMEDIATE')
+        try:
+            self._connection.execute('DELETE FROM machines_fts')
+            self._connection.executemany(
+                'INSERT INTO machines_fts (rowid, name, synopsis, labels, '
+                'makers, os, difficulty_text) VALUES (?,?,?,?,?,?,?)',
+                [self._to_document(json.loads(row[0])) for row in rows],
+            )
+            self._connection.execute('COMMIT')
+        except Exception:
+            self._connection.execute('ROLLBACK')
+            raise
+
+    def get_academy_modules(
+        self, machine_id: int
+    ) -> list[dict[str, Any]] | None:
+        """
+        Gets the stored academy modules of a machine.
+
+        :param machine_id: Machine identifier.
+
+        :return: Raw academy module records, or None if the modules of
+         the machine were never stored.
+        """
+        with self._lock:
+            row: tuple[str] | None = self._connection.execute(
+                'SELECT module_ids FROM machine_modules WHERE machine_id = ?',
+                (machine_id,),
+            ).fetchone()
+            if not row:
+                return None
+
+            module_ids: list[int] = json.loads(row[0])
+            modules: dict[int, dict[str, Any]] = {
+                module_id: json.loads(data)
+                for module_id, data in self._connection.execute(
+                    'SELECT id, data FROM academy_modules WHERE id IN '
+                    f'({",".join("?" * len(module_ids))})',
+                    module_ids,
+                )
+            }
+
+        return [
+            modules[module_id]
+            for module_id in module_ids
+            if module_id in modules
+        ]
+
+    def get_enriched_ids(self) -> set[int]:
+        """
+        Gets the identifiers of the machines whose academy modules are
+        stored.
+
+        :return: Set of machine identifiers.
+        """
+        with self._lock:
+            return {
+                row[0]
+                for row in self._connection.execute(
+                    'SELECT machine_id FROM machine_modules'
+                )
+            }
+
+    def get_ids(
+        self, retired: bool | None = None, synced: bool | None = None
+    ) -> set[int]:
+        """
+        Gets the identifiers of all stored machines.
+
+        :param retired: Get only retired machines if True, only active
+         machines if False, or all machines if None.
+        :param synced: Get only machines stored from a listing if True,
+         only machines fetched one by one if False, or all machines if
+         None.
+
+        :return: Set of machine identifiers.
+        """
+        conditions: list[str] = []
+        params: tuple[Any, ...] = ()
+        if retired is not None:
+            conditions.append('retired = ?')
+            params += (int(retired),)
+        if synced is not None:
+            conditions.append('synced = ?')
+            params += (int(synced),)
+
+        query: str = 'SELECT id FROM machines'
+        if conditions:
+            query += f' WHERE {" AND ".join(conditions)}'
+
+        with self._lock:
+            return {row[0] for row in self._connection.execute(query, params)}
+
+    def get_record(self, identifier: int | str) -> dict[str, Any] | None:
+        """
+        Gets a stored machine record by its identifier or name.
+
+        :param identifier: Machine identifier or case-insensitive name.
+
+        :return: The raw machine record, or None if it is not stored.
+        """
+        if isinstance(identifier, int) or identifier.isdigit():
+            query: str = 'SELECT data FROM machines WHERE id = ?'
+            params: tuple[Any, ...] = (int(identifier),)
+        else:
+            query: str = (
+                'SELECT data FROM machines WHERE name = ? COLLATE NOCASE'
+            )
+            params: tuple[Any, ...] = (identifier,)
+
+        with self._lock:
+            row: tuple[str] | None = self._connection.execute(
+                query, params
+            ).fetchone()
+
+        return json.loads(row[0]) if row else None
+
+    def iter_batches(
+        self, retired: bool | None = None, size: int = 100
+    ) -> Iterator[list[dict[str, Any]]]:
+        """
+        Iterates over stored machine records in batches, newest first,
+        reading a single batch at a time from the database.
+
+        :param retired: Get only retired machines if True, only active
+         machines if False, or all machines if None.
+        :param size: Quantity of records per batch. Default is 100.
+
+        :return: An iterator over lists of raw machine records.
+        """
+        last_id: int | None = None
+        while True:
+            conditions: list[str] = []
+            params: tuple[Any, ...] = ()
+            if retired is not None:
+                conditions.append('retired = ?')
+                params += (int(retired),)
+            if last_id is not None:
+                conditions.append('id < ?')
+                params += (last_id,)
+
+            query: str = 'SELECT id, data FROM machines'
+            if conditions:
+                query += f' WHERE {" AND ".join(conditions)}'
+            query += ' ORDER BY id DESC LIMIT ?'
+
+            with self._lock:
+                rows: list[tuple[int, str]] = self._connection.execute(
+                    query, (*params, size)
+                ).fetchall()
+
+            if not rows:
+                return
+
+            yield [json.loads(row[1]) for row in rows]
+            last_id = rows[-1][0]
+
+    def iter_records(
+        self, retired: bool | None = None, size: int | None = None
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Iterates over stored machine records, newest first.
+
+        :param retired: Get only retired machines if True, only active
+         machines if False, or all machines if None.
+        :param size: Maximum quantity of records. If None, all records
+         are returned.
+
+        :return: An iterator over raw machine records.
+        """
+        query: str = 'SELECT data FROM machines'
+        params: tuple[Any, ...] = ()
+        if retired is not None:
+            query += ' WHERE retired = ?'
+            params = (int(retired),)
+
+        query += ' ORDER BY id DESC'
+        if size is not None:
+            query += ' LIMIT ?'
+            params += (size,)
+
+        with self._lock:
+            rows: list[tuple[str]] = self._connection.execute(
+                query, params
+            ).fetchall()
+
+        for row in rows:
+            yield json.loads(row[0])
+
+    def iter_slims(
+        self, retired: bool | None = None, size: int | None = None
+    ) -> Iterator[tuple[int, bytes | None, dict[str, Any] | None]]:
+        """
+        Iterates over the serialized slim projections of stored
+        machines, newest first. The raw record is only decoded for
+        machines stored without a projection.
+
+        :param retired: Get only retired machines if True, only active
+         machines if False, or all machines if None.
+        :param size: Maximum quantity of machines. If None, all machines
+         are returned.
+
+        :return: An iterator over the machine identifier, the serialized
+         projection, or None, and the raw record when the projection is
+         missing.
+        """
+        query: str = (
+            'SELECT id, slim, CASE WHEN slim IS NULL THEN data END '
+            'FROM machines'
+        )
+        params: tuple[Any, ...] = ()
+        if retired is not None:
+            query += ' WHERE retired = ?'
+            params = (int(retired),)
+
+        query += ' ORDER BY id DESC'
+        if size is not None:
+            query += ' LIMIT ?'
+            params += (size,)
+
+        with self._lock:
+            rows: list[tuple[int, bytes | None, str | None]] = (
+                self._connection.execute(query, params).fetchall()
+            )
+
+        for machine_id, slim, data in rows:
+            yield machine_id, slim, None if data is None else json.loads(data)
+
+    def search(self, terms: str, size: int = 20) -> list[dict[str, Any]]:
+        """
+        Searches machine records by name, synopsis, labels, makers, OS
+        and difficulty. Every term must match, as a word prefix.
+
+        :param terms: Search terms.
+        :param size: Maximum quantity of records. Default is 20.
+
+        :return: Raw machine records, best ranked first.
+        """
+        tokens: list[str] = re.findall(r'\w+', terms)
+        if not tokens:
+            return []
+
+        query: str = ' '.join(f'"{token}"*' for token in tokens)
+        with self._lock:
+            rows: list[tuple[str]] = self._connection.execute(
+                'SELECT machines.data FROM machines_fts '
+                'JOIN machines ON machines.id = machines_fts.rowid '
+                'WHERE machines_fts MATCH ? ORDER BY rank LIMIT ?',
+                (query, size),
+            ).fetchall()
+
+        return [json.loads(row[0]) for row in rows]
+
+    def set_academy_modules(
+        self, modules_by_machine: dict[int, list[dict[str, Any]]]
+    ) -> None:
+        """
+        Stores the academy modules of machines. Modules shared by
+        several machines are stored once, by their identifier.
+
+        :param modules_by_machine: Raw academy module records by
+         machine identifier.
+        """
+        modules: dict[int, dict[str, Any]] = {
+            module['id']: module
+            for machine_modules in modules_by_machine.values()
+            for module in machine_modules
+        }
+
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                self._connection.executemany(
+                    'INSERT OR REPLACE INTO academy_modules (id, data) '
+                    'VALUES (?,?)',
+                    [
+                        (module_id, json.dumps(module))
+                        for module_id, module in modules.items()
+                    ],
+                )
+                self._connection.executemany(
+                    'INSERT OR REPLACE INTO machine_modules '
+                    '(machine_id, module_ids) VALUES (?,?)',
+                    [
+                        (
+                            machine_id,
+                            json.dumps([
+                                module['id'] for module in machine_modules
+                            ]),
+                        )
+                        for machine_id, machine_modules in (
+                            modules_by_machine.items()
+                        )
+                    ],
+                )
+                self._connection.execute('COMMIT')
+            except Exception:
+                self._connection.execute('ROLLBACK')
+                raise
+
+    def set_slims(self, slims: dict[int, bytes]) -> None:
+        """
+        Stores the serialized slim projections of stored machines.
+
+        :param slims: Serialized projections by machine identifier.
+        """
+        if not slims:
+            return
+
+        with self._lock:
+            self._connection.executemany(
+                'UPDATE machines SET slim = ? WHERE id = ?',
+                [(slim, machine_id) for machine_id, slim in slims.items()],
+            )
+
+    def upsert(
+        self,
+        records: list[dict[str, Any]],
+        retired: bool,
+        slims: list[bytes] | None = None,
+        synced: bool = True,
+    ) -> None:
+        """
+        Inserts machine records, replacing the ones already stored.
+
+        :param records: Raw machine records.
+        :param retired: If the records are retired machines.
+        :param slims: Serialized slim projections of the records, in
+         the same order. If None, records are stored without them.
+        :param synced: If the records come from a listing. Default is
+         True.
+        """
+        if not records:
+            return
+
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                self._connection.executemany(
+                    'INSERT OR REPLACE INTO machines '
+                    '(id, name, retired, release, data, slim, synced) '
+                    'VALUES (?,?,?,?,?,?,?)',
+                    [
+                        (
+                            record['id'],
+                            record.get('name') or record.get('value'),
+                            int(retired),
+                            record.get('release'),
+                            json.dumps(record),
+                            slim,
+                            int(synced),
+                        )
+                        for record, slim in zip(
+                            records, slims or [None] * len(records)
+                        )
+                    ],
+                )
+                self._connection.executemany(
+                    'DELETE FROM machines_fts WHERE rowid = ?',
+                    [(record['id'],) for record in records],
+                )
+                self._connection.executemany(
+                    'INSERT INTO machines_fts (rowid, name, synopsis, labels, '
+                    'makers, os, difficulty_text) VALUES (?,?,?,?,?,?,?)',
+                    [self._to_document(record) for record in records],
+                )
+                self._connection.execute('COMMIT')
+            except Exception:
+                self._connection.execute('ROLLBACK')
+                raise
@@ -0,0 +1,220 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+from .entities import HtbMachine
+from .entities.htb_feedback import HtbFeedback
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+class HtbExporter:
+    """
+    Writes machines to a columnar file, flattening nested fields such
+    as feedback counters, labels, makers and first bloods into typed
+    columns. Machines are written batch by batch, so memory stays flat
+    whatever the catalog size.
+
+    Arrow IPC and Parquet files need pyarrow. JSON Lines files, with a
+    flat object per machine, do not need any extra dependency.
+    """
+
+    formats: dict[str, str] = {
+        '.arrow': 'arrow',
+        '.feather': 'arrow',
+        '.ipc': 'arrow',
+        '.jsonl': 'jsonl',
+        '.parquet': 'parquet',
+    }
+    """File formats by file extension."""
+
+    columns: dict[str, str] = {
+        'id': 'int',
+        'name': 'str',
+        'os': 'str',
+        'difficulty': 'int',
+        'difficulty_text': 'str',
+        'stars': 'float',
+        'points': 'int',
+        'static_points': 'int',
+        'user_owns_count': 'int',
+        'root_owns_count': 'int',
+        'reviews_count': 'int',
+        'release': 'datetime',
+        'retired': 'int',
+        'active': 'bool',
+        'free': 'bool',
+        'is_completed': 'bool',
+        'is_todo': 'bool',
+        'auth_user_in_user_owns': 'bool',
+        'auth_user_in_root_owns': 'bool',
+        'synopsis': 'str',
+        'labels': 'list',
+        'makers': 'list',
+        **{
+            f'feedback_{counter}': 'int'
+            for counter in HtbFeedback.model_fields
+        },
+        **{
+            f'{blood}_{field}': kind
+            for blood in ['user_blood', 'root_blood']
+            for field, kind in [
+                ('user', 'str'),
+                ('difference', 'str'),
+                ('created_at', 'datetime'),
+            ]
+        },
+    }
+    """Exported columns and their types."""
+
+    @classmethod
+    def get_format(cls, path: Path, file_format: str | None = None) -> str:
+        """
+        Gets the format of an export file.
+
+        :param path: Export file path.
+        :param file_format: Explicit format, either "arrow", "parquet"
+         or "jsonl". If None, it is taken from the file extension.
+
+        :return: The file format.
+
+        :raise ValueError: When the format is unknown, or it needs
+         pyarrow and pyarrow is not installed.
+        """
+        file_format: str | None = file_format or cls.formats.get(
+            path.suffix.lower()
+        )
+        if file_format not in set(cls.formats.values()):
+            raise ValueError(
+                f'unknown export format for {path.name}, expected one of: '
+                f'{", ".join(sorted(set(cls.formats.values())))}'
+            )
+
+        if file_format != 'jsonl' and pa is None:
+            raise ValueError(
+                f'{file_format} export needs pyarrow, install it or export '
+                'to a .jsonl file instead'
+            )
+
+        return file_format
+
+    @classmethod
+    def get_schema(cls) -> 'pa.Schema':
+        """
+        Builds the Arrow schema of the exported columns.
+
+        :return: The Arrow schema.
+        """
+        types: dict[str, pa.DataType] = {
+            'bool': pa.bool_(),
+            'datetime': pa.timestamp('us', tz='UTC'),
+            'float': pa.float64(),
+            'int': pa.int64(),
+            'list': pa.list_(pa.string()),
+            'str': pa.string(),
+        }
+
+        return pa.schema([
+            (column, types[kind]) for column, kind in cls.columns.items()
+        ])
+
+    @classmethod
+    def to_row(cls, machine: HtbMachine) -> dict[str, Any]:
+        """
+        Flattens a machine into a row of the exported columns.
+
+        :param machine: Machine object.
+
+        :return: Dictionary with a value per column.
+        """
+        row: dict[str, Any] = {
+            column: getattr(machine, column)
+            for column in cls.columns
+            if column in HtbMachine.model_fields
+        }
+        row['labels'] = [label.name for label in machine.labels or []]
+        row['makers'] = [maker.name for maker in machine.makers or []]
+
+        for counter in HtbFeedback.model_fields:
+            row[f'feedback_{counter}'] = (
+                getattr(machine.feedback, counter)
+                if machine.feedback
+                else None
+            )
+
+        for blood in ['user_blood', 'root_blood']:
+            first_blood: Any = getattr(machine, blood)
+            row[f'{blood}_user'] = (
+                first_blood.user.name if first_blood else None
+            )
+            row[f'{blood}_difference'] = (
+                first_blood.blood_difference if first_blood else None
+            )
+            row[f'{blood}_created_at'] = (
+                first_blood.created_at if first_blood else None
+            )
+
+        return row
+
+    @classmethod
+    def write(
+        cls,
+        path: Path,
+        batches: Iterator[list[HtbMachine]],
+        file_format: str | None = None,
+    ) -> int:
+        """
+        Writes batches of machines to a file, one batch at a time.
+
+        :param path: Export file path.
+        :param batches: An iterator over lists of machines.
+        :param file_format: Explicit format, either "arrow", "parquet"
+         or "jsonl". If None, it is taken from the file extension.
+
+        :return: Quantity of machines written.
+
+        :raise ValueError: When the format is unknown, or it needs
+         pyarrow and pyarrow is not installed.
+        """
+        file_format: str = cls.get_format(path, file_format)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        count: int = 0
+
+        if file_format == 'jsonl':
+            with path.open('w', encoding='utf-8') as file:
+                for machines in batches:
+                    file.writelines(
+                        json.dumps(
+                            cls.to_row(machine),
+                            default=datetime.isoformat,
+                        )
+                        + '\n'
+                        for machine in machines
+                    )
+                    count += len(machines)
+
+            return count
+
+        schema: pa.Schema = cls.get_schema()
+        writer: Any = (
+            pq.ParquetWriter(path, schema)
+            if file_format == 'parquet'
+            else pa.ipc.new_file(str(path), schema)
+        )
+        with writer:
+            for machines in batches:
+                writer.write_batch(
+                    pa.RecordBatch.from_pylist(
+                        [cls.to_row(machine) for machine in machines],
+                        schema=schema,
+                    )
+                )
+                count += len(machines)
+
+        return count
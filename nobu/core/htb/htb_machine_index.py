@@ -0,0 +1,240 @@
+import threading
+from typing import Any
+
+from .entities import HtbMachine, HtbMachineSlim
+from .htb_query import HtbQuery
+
+
+class HtbMachineIndex:
+    """
+    Indexes machines by identifier and by name, for constant time
+    lookups across a session, and by the values of low cardinality
+    fields, so queries only check the machines that can match. Machines
+    are kept as slim projections to hold the whole catalog in memory.
+    The index is shared across the session and filled in background by
+    the warm up, so every access holds its lock.
+    """
+
+    indexed_fields: tuple[str, ...] = (
+        'active',
+        'auth_user_in_root_owns',
+        'auth_user_in_user_owns',
+        'difficulty',
+        'difficulty_text',
+        'free',
+        'is_completed',
+        'is_todo',
+        'os',
+        'retired',
+    )
+    """Fields with a secondary index."""
+
+    indexed_operators: tuple[str, ...] = ('=', 'in')
+    """Operators answered by the secondary indexes."""
+
+    def __init__(self) -> None:
+        """
+        Initializes HtbMachineIndex object attributes.
+        """
+        self.by_id: dict[int, HtbMachineSlim] = {}
+        self.by_name: dict[str, HtbMachineSlim] = {}
+        self.by_field: dict[str, dict[Any, set[int]]] = {
+            field: {} for field in self.indexed_fields
+        }
+        self._lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def add(
+        self,
+        machine: HtbMachine | HtbMachineSlim,
+        record: dict[str, Any] | None = None,
+    ) -> None:
+        """
+        Adds a machine to the index, replacing any previous version.
+
+        :param machine: Machine to be indexed, or its slim projection.
+        :param record: Raw machine record the machine was parsed from,
+         kept to hydrate the full machine later. Not needed for slim
+         projections.
+        """
+        if not isinstance(machine, HtbMachineSlim):
+            machine: HtbMachineSlim = HtbMachineSlim(machine, record)
+
+        with self._lock:
+            previous: HtbMachineSlim | None = self.by_id.get(machine.id)
+            if previous:
+                for field, values in self.by_field.items():
+                    values.get(
+                        HtbQuery.get_value(previous, field), set()
+                    ).discard(previous.id)
+
+            self.by_id[machine.id] = machine
+            self.by_name[machine.name.lower()] = machine
+            for field, values in self.by_field.items():
+                values.setdefault(
+                    HtbQuery.get_value(machine, field), set()
+                ).add(machine.id)
+
+    def get(self, identifier: int | str) -> HtbMachineSlim | None:
+        """
+        Gets a machine by its identifier or name.
+
+        :param identifier: Machine identifier or case-insensitive name.
+
+        :return: The machine, or None if it is not indexed.
+        """
+        with self._lock:
+            if isinstance(identifier, int) or identifier.isdigit():
+                return self.by_id.get(int(identifier))
+
+            return self.by_name.get(identifier.lower())
+
+    def get_ids(self) -> set[int]:
+        """
+        Gets the identifiers of all indexed machines.
+
+        :return: Set of machine identifiers.
+        """
+        with self._lock:
+            return set(self.by_id)
+
+    @staticmethod
+    def hydrate(
+        machine: HtbMachineSlim, hydrated: dict[int, HtbMachine]
+    ) -> HtbMachine:
+        """
+        Hydrates a slim machine once per memo, so fields out of the
+        projection are not decompressed and validated on every read.
+
+        :param machine: Slim machine object.
+        :param hydrated: Full machines already hydrated, by identifier.
+
+        :return: Full machine object.
+        """
+        if machine.id not in hydrated:
+            hydrated[machine.id] = machine.hydrate()
+
+        return hydrated[machine.id]
+
+    def query(
+        self,
+        query: HtbQuery,
+        ids: set[int] | None = None,
+        hydrated: dict[int, HtbMachine] | None = None,
+    ) -> list[HtbMachineSlim]:
+        """
+        Gets the machines matching a query. Equality and ``in``
+        conditions on indexed fields are answered by intersecting the
+        identifier sets of their values, and only the remaining
+        candidates are checked against the other conditions. Conditions
+        on fields out of the slim projection are checked last, on a
+        single hydration of each candidate still matching.
+
+        :param query: Parsed filter expression.
+        :param ids: Identifiers the results are restricted to. If None,
+         all indexed machines are candidates.
+        :param hydrated: Full machines already hydrated, by identifier,
+         filled with the ones hydrated here. If None, a new one is used.
+
+        :return: List of matching machines, in no particular order.
+        """
+        with self._lock:
+            candidates: set[int] | None = (
+                None if ids is None else ids & self.by_id.keys()
+            )
+            conditions: list[tuple[str, str, list[Any]]] = []
+            for condition in query.conditions:
+                field, operator_name, values = condition
+                if (
+                    field not in self.by_field
+                    or operator_name not in self.indexed_operators
+                ):
+                    conditions.append(condition)
+                    continue
+
+                matched: set[int] = set().union(*[
+                    self.by_field[field].get(value, set()) for value in values
+                ])
+                candidates = (
+                    matched if candidates is None else candidates & matched
+                )
+
+            machines: list[HtbMachineSlim] = [
+                self.by_id[identifier]
+                for identifier in (
+                    self.by_id.keys() if candidates is None else candidates
+                )
+            ]
+
+        projected: list[tuple[str, str, list[Any]]] = [
+            condition
+            for condition in conditions
+            if condition[0] in HtbMachineSlim.fields
+        ]
+        unprojected: list[tuple[str, str, list[Any]]] = [
+            condition
+            for condition in conditions
+            if condition[0] not in HtbMachineSlim.fields
+        ]
+        machines = [
+            machine
+            for machine in machines
+            if query.matches(machine, projected)
+        ]
+        if not unprojected:
+            return machines
+
+        hydrated: dict[int, HtbMachine] = {} if hydrated is None else hydrated
+        return [
+            machine
+            for machine in machines
+            if query.matches(self.hydrate(machine, hydrated), unprojected)
+        ]
+
+    @classmethod
+    def sort(
+        cls,
+        machines: list[HtbMachineSlim],
+        field: str,
+        descending: bool = False,
+        hydrated: dict[int, HtbMachine] | None = None,
+    ) -> list[HtbMachineSlim]:
+        """
+        Sorts machines by a field, leaving the ones without a value at
+        the end. Fields out of the slim projection are read from a
+        single hydration of each machine.
+
+        :param machines: Machines to be sorted.
+        :param field: Machine field name.
+        :param descending: Sort from the greatest value. Default is
+         False.
+        :param hydrated: Full machines already hydrated, by identifier,
+         filled with the ones hydrated here. If None, a new one is used.
+
+        :return: Sorted list of machines.
+
+        :raise ValueError: When the field is unknown or non scalar.
+        """
+        HtbQuery.get_annotation(field)
+        projected: bool = field in HtbMachineSlim.fields
+        hydrated: dict[int, HtbMachine] = {} if hydrated is None else hydrated
+        keyed: list[tuple[Any, HtbMachineSlim]] = [
+            (
+                HtbQuery.get_value(
+                    machine if projected else cls.hydrate(machine, hydrated),
+                    field,
+                ),
+                machine,
+            )
+            for machine in machines
+        ]
+        valued: list[tuple[Any, HtbMachineSlim]] = [
+            item for item in keyed if item[0] is not None
+        ]
+        valued.sort(key=lambda item: item[0], reverse=descending)
+
+        return [machine for _, machine in valued] + [
+            machine for value, machine in keyed if value is None
+        ]
@@ -1,17 +1,103 @@
 import logging
+import threading
+from collections import OrderedDict
 from typing import Any
 
-from .entities import HtbMachine, HtbUser
+from pydantic import TypeAdapter
+
+from .entities import HtbMachine
+from .entities.htb_academy_module import HtbAcademyModule
 
 
 class HtbParser:
     _logger: logging.Logger = logging.getLogger(__name__)
+    _machines: TypeAdapter[list[HtbMachine]] = TypeAdapter(list[HtbMachine])
+    _modules: dict[int, HtbAcademyModule] = {}
+    _pages: OrderedDict[str, list[HtbMachine]] = OrderedDict()
+    _max_pages: int = 64
+    _pages_lock: threading.Lock = threading.Lock()
+
+    @classmethod
+    def to_academy_modules(
+        cls, modules: list[dict[str, Any]]
+    ) -> list[HtbAcademyModule]:
+        """
+        Parses academy modules. Modules are parsed once per identifier
+        and the same object is shared by every machine referencing it.
+
+        :param modules: Raw academy module records.
+
+        :return: List of academy module objects.
+        """
+        try:
+            parsed: list[HtbAcademyModule] = []
+            for module in modules:
+                if module['id'] not in cls._modules:
+                    cls._modules[module['id']] = (
+                        HtbAcademyModule.model_validate(module)
+                    )
+                parsed.append(cls._modules[module['id']])
+
+            return parsed
+        except Exception as ex:
+            cls._logger.exception(str(ex), exc_info=True)
+            raise
+
+    @classmethod
+    def to_machine_list(
+        cls, machines: dict[str, Any], digest: str | None = None
+    ) -> list[HtbMachine]:
+        """
+        Parses a page of machines, validating the whole page in a single
+        call. Pages whose body digest was already parsed in this session
+        are returned without being parsed again. Parsed pages are kept
+        apart and callers get copies of their machines, so setting the
+        fields of a returned machine does not change the kept page.
+        Kept pages are shared by every thread of the session, so they
+        are read and written holding a lock.
+
+        :param machines: Page of machines.
+        :param digest: Digest of the page body. If None, the page is
+         parsed and not kept.
+
+        :return: List of machine objects.
+        """
+        try:
+            with cls._pages_lock:
+                kept: list[HtbMachine] | None = cls._pages.get(digest)
+                if kept is not None:
+                    cls._pages.move_to_end(digest)
+
+            if kept is not None:
+                return [machine.model_copy() for machine in kept]
+
+            parsed: list[HtbMachine] = cls._machines.validate_python(
+                machines['data']
+            )
+
+            if digest:
+                with cls._pages_lock:
+                    cls._pages[digest] = parsed
+                    if len(cls._pages) > cls._max_pages:
+                        cls._pages.popitem(last=False)
+                return [machine.model_copy() for machine in parsed]
+
+            return parsed
+        except Exception as ex:
+            cls._logger.exception(str(ex), exc_info=True)
+            raise
 
     @classmethod
-    def to_machine_list(cls, machines: dict[str, Any]) -> list[HtbMachine]:
+    def to_machines(cls, records: list[dict[str, Any]]) -> list[HtbMachine]:
+        """
+        Parses machine records, validating all of them in a single call.
+
+        :param records: Raw machine records.
+
+        :return: List of machine objects.
+        """
         try:
-            data: list[str, Any] = machines['data']
-            return [HtbParser.to_machine(machine) for machine in data]
+            return cls._machines.validate_python(records)
         except Exception as ex:
             cls._logger.exception(str(ex), exc_info=True)
             raise
@@ -19,15 +105,7 @@ class HtbParser:
     @classmethod
     def to_machine(cls, machine_dict: dict[str, Any]) -> HtbMachine:
         try:
-            makers: list[HtbUser] = []
-            for user in [
-                machine_dict.get('maker'),
-                machine_dict.get('maker2'),
-            ]:
-                if user:
-                    makers.append(HtbUser(**user))
-
-            return HtbMachine(**machine_dict, makers=makers)
+            return HtbMachine.model_validate(machine_dict)
 
         except Exception as ex:
             cls._logger.exception(str(ex), exc_info=True)
@@ -0,0 +1,209 @@
+import operator
+import re
+import types
+from datetime import datetime, timezone
+from typing import Any, Callable, Union, get_args, get_origin
+
+from pydantic import TypeAdapter, ValidationError
+
+from .entities import HtbMachine, HtbMachineSlim
+
+
+class HtbQuery:
+    """
+    Filter expression over machine fields, such as
+    ``os=Linux and difficulty_text in (Hard, Insane) and stars>=4.5``.
+    Conditions are joined by ``and`` and text values are compared
+    ignoring case.
+    """
+
+    operators: dict[str, Callable[[Any, Any], bool]] = {
+        '=': operator.eq,
+        '!=': operator.ne,
+        '>': operator.gt,
+        '>=': operator.ge,
+        '<': operator.lt,
+        '<=': operator.le,
+    }
+    """Comparison operators, besides ``in`` and ``not in``."""
+
+    _condition: re.Pattern = re.compile(
+        r'\s*(?P<field>\w+)\s*'
+        r'(?P<operator>>=|<=|!=|=|>|<|\bnot\s+in\b|\bin\b)\s*'
+        r'(?P<value>\([^)]*\)|"[^"]*"|\'[^\']*\'|[^\s()]+)\s*'
+        r'(?P<join>\band\b|$)',
+        re.IGNORECASE,
+    )
+    _scalar_types: tuple[type, ...] = (bool, datetime, float, int, str)
+    _adapters: dict[str, TypeAdapter] = {}
+
+    def __init__(self, expression: str) -> None:
+        """
+        Initializes HtbQuery object attributes, parsing the expression.
+
+        :param expression: Filter expression. An empty expression
+         matches every machine.
+
+        :raise ValueError: When the expression is invalid or refers to
+         an unknown or non scalar field.
+        """
+        self.expression: str = expression.strip()
+        self.conditions: list[tuple[str, str, list[Any]]] = []
+
+        position: int = 0
+        while position < len(self.expression):
+            match: re.Match | None = self._condition.match(
+                self.expression, position
+            )
+            if not match:
+                raise ValueError(
+                    f'invalid query near "{self.expression[position:]}"'
+                )
+
+            field: str = match['field']
+            operator_name: str = ' '.join(match['operator'].lower().split())
+            raw_value: str = match['value']
+            raw_values: list[str] = (
+                raw_value[1:-1].split(',')
+                if raw_value.startswith('(')
+                else [raw_value]
+            )
+            if operator_name not in {'in', 'not in'} and len(raw_values) > 1:
+                raise ValueError(
+                    f'operator {operator_name} expects a single value'
+                )
+
+            self.conditions.append((
+                field,
+                operator_name,
+                [self.to_value(field, value) for value in raw_values],
+            ))
+            position = match.end()
+            if match['join'] and position >= len(self.expression):
+                raise ValueError('query cannot end with and')
+
+    @classmethod
+    def to_value(cls, field: str, raw_value: str) -> Any:
+        """
+        Converts a literal of the expression to the type of a machine
+        field.
+
+        :param field: Machine field name.
+        :param raw_value: Literal, optionally quoted.
+
+        :return: The converted value. Text is lowercased and dates
+         without a timezone are taken as UTC.
+
+        :raise ValueError: When the field is unknown or non scalar, or
+         the literal does not match its type.
+        """
+        adapter: TypeAdapter = cls.get_adapter(field)
+        value: str = raw_value.strip().strip('"\'')
+        if value.lower() in {'none', 'null'}:
+            return None
+
+        try:
+            converted: Any = adapter.validate_python(value)
+        except ValidationError as ex:
+            raise ValueError(
+                f'invalid value {value} for machine field {field}'
+            ) from ex
+
+        if isinstance(converted, str):
+            return converted.lower()
+        if isinstance(converted, datetime) and not converted.tzinfo:
+            return converted.replace(tzinfo=timezone.utc)
+
+        return converted
+
+    @classmethod
+    def get_adapter(cls, field: str) -> TypeAdapter:
+        """
+        Gets the validator of a scalar machine field. Validators are
+        built once per field, as building one costs far more than
+        validating a value.
+
+        :param field: Machine field name.
+
+        :return: The field type adapter.
+
+        :raise ValueError: When the field is unknown or non scalar.
+        """
+        if field not in cls._adapters:
+            cls._adapters[field] = TypeAdapter(cls.get_annotation(field))
+
+        return cls._adapters[field]
+
+    @classmethod
+    def get_annotation(cls, field: str) -> Any:
+        """
+        Gets the type of a scalar machine field.
+
+        :param field: Machine field name.
+
+        :return: The field type annotation.
+
+        :raise ValueError: When the field is unknown or non scalar.
+        """
+        if field not in HtbMachine.model_fields:
+            raise ValueError(f'unknown machine field {field}')
+
+        annotation: Any = HtbMachine.model_fields[field].annotation
+        types_: tuple[Any, ...] = (
+            get_args(annotation)
+            if get_origin(annotation) in {Union, types.UnionType}
+            else (annotation,)
+        )
+        if not all(
+            item is type(None) or item in cls._scalar_types for item in types_
+        ):
+            raise ValueError(f'machine field {field} cannot be queried')
+
+        return annotation
+
+    @staticmethod
+    def get_value(machine: HtbMachine | HtbMachineSlim, field: str) -> Any:
+        """
+        Gets the value of a machine field in its comparable form.
+
+        :param machine: Machine object.
+        :param field: Machine field name.
+
+        :return: The field value, lowercased when it is text.
+        """
+        value: Any = getattr(machine, field)
+        return value.lower() if isinstance(value, str) else value
+
+    def matches(
+        self,
+        machine: HtbMachine | HtbMachineSlim,
+        conditions: list[tuple[str, str, list[Any]]] | None = None,
+    ) -> bool:
+        """
+        Checks if a machine matches every condition.
+
+        :param machine: Machine object.
+        :param conditions: Conditions to be checked. If None, all the
+         conditions of the query are checked.
+
+        :return: True if the machine matches, False otherwise.
+        """
+        for field, operator_name, values in (
+            self.conditions if conditions is None else conditions
+        ):
+            value: Any = self.get_value(machine, field)
+            if operator_name == 'in':
+                if value not in values:
+                    return False
+            elif operator_name == 'not in':
+                if value in values:
+                    return False
+            elif operator_name in {'=', '!='}:
+                if not self.operators[operator_name](value, values[0]):
+                    return False
+            elif value is None or values[0] is None:
+                return False
+            elif not self.operators[operator_name](value, values[0]):
+                return False
+
+        return True
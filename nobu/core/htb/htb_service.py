@@ -1,14 +1,28 @@
 import logging
-from typing import Any
+import sys
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Iterator
 
-from nobu.clients.htb import HtbClient
+from requests import HTTPError
+
+from nobu.clients.cache import CacheStats
+from nobu.clients.htb import HtbClient, HtbResource
 from nobu.settings import Settings
 
-from .entities import HtbMachine
+from .entities import HtbMachine, HtbMachineSlim, HtbMachineStats
+from .htb_analytics import HtbAnalytics
+from .htb_catalog import HtbCatalog
+from .htb_exporter import HtbExporter
+from .htb_machine_index import HtbMachineIndex
 from .htb_parser import HtbParser
+from .htb_query import HtbQuery
 
 
 class HtbService:
+    index: HtbMachineIndex = HtbMachineIndex()
+
     def __init__(self) -> None:
         """
         Initializes all HtbService object attributes.
@@ -24,29 +38,390 @@ class HtbService:
         if not self.token:
             raise ValueError('could not find HTB token')
 
-        self.client: HtbClient = HtbClient(token=self.token)
+        self.client: HtbClient = HtbClient(
+            token=self.token,
+            cache_backend=self.settings.cache_backend,
+            cache_name=self.settings.cache_name,
+            cache_max_bytes=self.settings.cache_max_bytes,
+            cache_compress=self.settings.cache_compress,
+            cache_stale_while_revalidate=(
+                self.settings.cache_stale_while_revalidate
+            ),
+        )
+        self.catalog: HtbCatalog = HtbCatalog(
+            Path(self.settings.data_dir) / 'htb.sqlite'
+        )
+        self.sync_window: int = 20
+
+    def _load_slims(
+        self, retired: bool | None = None, size: int | None = None
+    ) -> list[HtbMachineSlim]:
+        """
+        Loads the slim projections stored in the local catalog, newest
+        first, without decoding or validating their records. Machines
+        stored without a projection, or with a projection of another
+        version, are parsed once and their projection is stored for the
+        next sessions.
+
+        :param retired: Load only retired machines if True, only active
+         machines if False, or all machines if None.
+        :param size: Maximum quantity of machines. If None, all machines
+         are loaded.
+
+        :return: List of slim machine objects.
+        """
+        rows: list[tuple[int, bytes | None, dict[str, Any] | None]] = list(
+            self.catalog.iter_slims(retired=retired, size=size)
+        )
+        machines: dict[int, HtbMachineSlim] = {}
+        records: list[dict[str, Any]] = []
+        for machine_id, slim, record in rows:
+            if slim is None:
+                records.append(record)
+                continue
+
+            try:
+                machines[machine_id] = HtbMachineSlim.from_bytes(slim)
+            except ValueError:
+                records.append(self.catalog.get_record(machine_id))
+
+        parsed: dict[int, HtbMachineSlim] = {
+            record['id']: HtbMachineSlim(machine, record)
+            for record, machine in zip(records, HtbParser.to_machines(records))
+        }
+        self.catalog.set_slims({
+            machine_id: machine.to_bytes()
+            for machine_id, machine in parsed.items()
+        })
+        machines.update(parsed)
+
+        return [machines[machine_id] for machine_id, _, _ in rows]
+
+    def analyze_machines(
+        self,
+        metric: str = '-gap',
+        size: int | None = None,
+        retired: bool | None = None,
+    ) -> list[HtbMachineStats]:
+        """
+        Ranks the machines of the local catalog by their community
+        difficulty analytics, without any network call.
+
+        :param metric: Metric to rank by, one of "gap", "owns",
+         "perceived", "root" or "stars", prefixed with "-" for a
+         descending order. Default is "-gap".
+        :param size: Maximum quantity of machines. If None, all machines
+         are returned.
+        :param retired: Analyze only retired machines if True, only
+         active machines if False, or all machines if None.
+
+        :return: List of machine statistics.
+
+        :raise ValueError: When the metric is unknown.
+        :raise Exception: When an unexpected error occurs.
+        """
+        try:
+            analytics: HtbAnalytics = HtbAnalytics(
+                list(self.catalog.iter_records(retired=retired))
+            )
+            return analytics.rank(metric=metric, size=size)
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    def enrich_machines(
+        self, identifiers: list[int] | None = None, update: bool = False
+    ) -> tuple[dict[int, list[int]], dict[int, str]]:
+        """
+        Enriches machines of the local catalog with their academy
+        modules. Machine profiles are fetched at the same time on a
+        bounded worker pool, and their modules are de-duplicated by
+        identifier, so each module is parsed and stored only once
+        however many machines share it. A profile that fails to be
+        fetched does not stop the others, whose modules are stored.
+
+        :param identifiers: Identifiers of the machines to be enriched.
+         If None, all machines of the catalog are enriched.
+        :param update: Fetch the modules of machines already enriched
+         again.
+
+        :return: Academy module identifiers by enriched machine
+         identifier, and error messages by machine identifier whose
+         profile could not be fetched.
+
+        :raise Exception: When an unexpected error occurs.
+        """
+        try:
+            pending: list[int] = sorted(
+                set(identifiers or self.catalog.get_ids())
+                - (set() if update else self.catalog.get_enriched_ids())
+            )
+            if not pending:
+                return {}, {}
+
+            modules_by_machine: dict[int, list[dict[str, Any]]] = {}
+            failures: dict[int, str] = {}
+            with ThreadPoolExecutor(
+                max_workers=min(self.client.max_workers, len(pending))
+            ) as executor:
+                futures: dict[Future, int] = {
+                    executor.submit(
+                        self.client.get_machine_profile, machine_id
+                    ): machine_id
+                    for machine_id in pending
+                }
+                for future in as_completed(futures):
+                    machine_id: int = futures[future]
+                    try:
+                        profile: dict[str, Any] = future.result()
+                    except Exception as ex:
+                        failures[machine_id] = str(ex)
+                        continue
+
+                    modules_by_machine[machine_id] = (
+                        profile['info'].get('academy_modules') or []
+                    )
+
+            HtbParser.to_academy_modules([
+                module
+                for modules in modules_by_machine.values()
+                for module in modules
+            ])
+            self.catalog.set_academy_modules(modules_by_machine)
+
+            return {
+                machine_id: [module['id'] for module in modules]
+                for machine_id, modules in modules_by_machine.items()
+            }, failures
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    def export_machines(
+        self,
+        path: Path,
+        file_format: str | None = None,
+        retired: bool | None = None,
+    ) -> int:
+        """
+        Exports the machines of the local catalog to a columnar file,
+        reading, parsing and writing them in page sized batches.
+
+        :param path: Export file path.
+        :param file_format: Either "arrow", "parquet" or "jsonl". If
+         None, it is taken from the file extension.
+        :param retired: Export only retired machines if True, only
+         active machines if False, or all machines if None.
+
+        :return: Quantity of machines exported.
+
+        :raise ValueError: When the format is unknown, or it needs
+         pyarrow and pyarrow is not installed.
+        :raise Exception: When an unexpected error occurs.
+        """
+        try:
+            return HtbExporter.write(
+                path,
+                (
+                    HtbParser.to_machines(records)
+                    for records in self.catalog.iter_batches(retired=retired)
+                ),
+                file_format=file_format,
+            )
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    def get_cache_stats(self) -> CacheStats:
+        """
+        Gets the HTB cache size, entry count and the counters of how
+        responses were served in this session.
+
+        :return: Cache statistics.
+
+        :raise Exception: When an unexpected error occurs.
+        """
+        try:
+            return self.client.get_cache_stats()
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    def get_machine(
+        self, identifier: int | str, fetch: bool = True
+    ) -> HtbMachine | None:
+        """
+        Gets a machine by its identifier or name. It is looked up in
+        the session index first, then in the local catalog and, only on
+        a miss, through a single machine profile request. Academy
+        modules stored by an enrichment are attached to the machine.
+
+        :param identifier: Machine identifier or case-insensitive name.
+        :param fetch: Request the machine profile on a miss. If False,
+         only the session index and the local catalog are looked up.
+         Default is True.
+
+        :return: The machine, or None if it does not exist.
+
+        :raise Exception: When an unexpected error occurs.
+        """
+        try:
+            slim: HtbMachineSlim | None = HtbService.index.get(identifier)
+            record: dict[str, Any] | None = (
+                None if slim else self.catalog.get_record(identifier)
+            )
+            if slim:
+                machine: HtbMachine = slim.hydrate()
+            elif record:
+                machine: HtbMachine = HtbParser.to_machine(record)
+                HtbService.index.add(machine, record)
+            elif not fetch:
+                return None
+            else:
+                try:
+                    profile: dict[str, Any] = self.client.get_machine_profile(
+                        identifier
+                    )
+                except HTTPError as ex:
+                    if ex.response is not None and (
+                        ex.response.status_code == HTTPStatus.NOT_FOUND
+                    ):
+                        return None
+                    raise
+
+                record: dict[str, Any] = profile['info']
+                machine: HtbMachine = HtbParser.to_machine(record)
+                modules: list[dict[str, Any]] | None = record.pop(
+                    'academy_modules', None
+                )
+                slim: HtbMachineSlim = HtbMachineSlim(machine, record)
+                self.catalog.upsert(
+                    [record],
+                    retired=bool(record.get('retired')),
+                    slims=[slim.to_bytes()],
+                    synced=False,
+                )
+                if modules is not None:
+                    self.catalog.set_academy_modules({machine.id: modules})
+                HtbService.index.add(slim)
+
+            modules: list[dict[str, Any]] | None = (
+                self.catalog.get_academy_modules(machine.id)
+            )
+            if modules is not None:
+                machine.academy_modules = HtbParser.to_academy_modules(modules)
+
+            return machine
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    def invalidate(self, resource: str | None = None) -> None:
+        """
+        Invalidates the cached responses of an HTB resource.
+
+        :param resource: Name of the resource to be invalidated, such
+         as "active" or "retired". If None, the whole cache is cleared.
+
+        :raise ValueError: When the resource is unknown.
+        :raise Exception: When an unexpected error occurs.
+        """
+        try:
+            resources: list[str] = [item.value for item in HtbResource]
+            if resource and resource not in resources:
+                raise ValueError(
+                    f'unknown resource {resource}, expected one of: '
+                    f'{", ".join(resources)}'
+                )
+
+            self.client.invalidate(HtbResource(resource) if resource else None)
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    def iter_machines(
+        self, size: int, update: bool, retired: bool
+    ) -> Iterator[HtbMachineSlim]:
+        """
+        Iterates over HTB machines as their pages arrive, without
+        fetching more pages than needed to reach the requested size.
+        Machines are slim projections, active and retired alike, and
+        the full machine is hydrated from them when needed.
+
+        :param size: Quantity of machines to be returned.
+        :param retired: List only retired machines.
+        :param update: Revalidate the results with the server rather
+         than getting them from cache.
+
+        :return: An iterator over slim machine objects. Active machines
+         come in the order they are returned by the API, and retired
+         machines are synced into the local catalog and read from it,
+         newest first.
+
+        :raise Exception: When an unexpected error occurs.
+        """
+        try:
+            if retired:
+                self.sync_retired(full=update)
+                for machine in self._load_slims(retired=True, size=size):
+                    HtbService.index.add(machine)
+                    yield machine
+                return
+
+            remaining: int = size
+            for page, digest in self.client.iter_pages(
+                size=size, update=update, retired=retired
+            ):
+                machines: list[HtbMachine] = HtbParser.to_machine_list(
+                    page, digest
+                )
+                slims: list[HtbMachineSlim] = [
+                    HtbMachineSlim(machine, record)
+                    for record, machine in zip(page['data'], machines)
+                ]
+                self.catalog.upsert(
+                    page['data'],
+                    retired=False,
+                    slims=[slim.to_bytes() for slim in slims],
+                )
+                slims: list[HtbMachineSlim] = slims[:remaining]
+                remaining -= len(slims)
+                for slim in slims:
+                    HtbService.index.add(slim)
+                    yield slim
+
+                if remaining <= 0:
+                    break
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
 
     def list_machines(
         self, size: int, update: bool, retired: bool
-    ) -> list[HtbMachine]:
+    ) -> list[HtbMachineSlim]:
         """
         Lists HTB machines.
 
         :param size: Quantity of machines to be returned.
         :param retired: List only retired machines.
-        :param update: Force update the result rather than getting
-         from cache.
+        :param update: Revalidate the results with the server rather
+         than getting them from cache.
 
-        :return: List of machine objects.
+        :return: List of slim machine objects, newest first.
 
         :raise Exception: When an unexpected error occurs.
         """
         try:
-            response: dict[str, Any] = self.client.list_machines(
-                size=size, update=update, retired=retired
+            machines: list[HtbMachineSlim] = list(
+                self.iter_machines(size=size, update=update, retired=retired)
             )
-
-            machines = HtbParser.to_machine_list(response)
             machines.sort(reverse=True)
 
             return machines
@@ -54,3 +429,171 @@ class HtbService:
         except Exception as ex:
             self.logger.exception(str(ex), exc_info=True)
             raise
+
+    def query_machines(
+        self,
+        expression: str = '',
+        sort: str | None = None,
+        size: int | None = None,
+        retired: bool | None = None,
+    ) -> list[HtbMachineSlim]:
+        """
+        Filters and sorts the machines of the local catalog, without any
+        network call. Catalog records missing from the session index
+        are parsed and indexed once, so later queries run in memory.
+
+        :param expression: Filter expression, such as
+         ``os=Linux and difficulty_text in (Hard, Insane)``. An empty
+         expression matches every machine.
+        :param sort: Machine field to sort by, prefixed with "-" for a
+         descending order. If None, newest machines come first.
+        :param size: Maximum quantity of machines. If None, all
+         matching machines are returned.
+        :param retired: Query only retired machines if True, only active
+         machines if False, or all machines if None.
+
+        :return: List of slim machine objects, hydrated on demand.
+
+        :raise ValueError: When the expression or the sort field is
+         invalid.
+        :raise Exception: When an unexpected error occurs.
+        """
+        try:
+            query: HtbQuery = HtbQuery(expression)
+
+            missing: set[int] = (
+                self.catalog.get_ids() - HtbService.index.get_ids()
+            )
+            if missing:
+                for machine in self._load_slims():
+                    if machine.id in missing:
+                        HtbService.index.add(machine)
+
+            hydrated: dict[int, HtbMachine] = {}
+            machines: list[HtbMachineSlim] = HtbService.index.query(
+                query,
+                ids=None
+                if retired is None
+                else self.catalog.get_ids(retired=retired),
+                hydrated=hydrated,
+            )
+            machines.sort(reverse=True)
+            if sort:
+                machines: list[HtbMachineSlim] = HtbService.index.sort(
+                    machines,
+                    field=sort.removeprefix('-'),
+                    descending=sort.startswith('-'),
+                    hydrated=hydrated,
+                )
+
+            return machines if size is None else machines[:size]
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    def search_machines(self, terms: str, size: int = 20) -> list[HtbMachine]:
+        """
+        Searches machines in the local catalog, without any network
+        call. The catalog holds every machine already listed and the
+        synced retired machines.
+
+        :param terms: Search terms, matched as word prefixes against
+         name, synopsis, labels, makers, OS and difficulty.
+        :param size: Maximum quantity of machines. Default is 20.
+
+        :return: List of machine objects, best ranked first.
+
+        :raise Exception: When an unexpected error occurs.
+        """
+        try:
+            return HtbParser.to_machines(self.catalog.search(terms, size=size))
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    def sync_retired(self, full: bool = False) -> int:
+        """
+        Syncs retired machines into the local catalog. New machines are
+        only added at the head of the retired list, so pages are fetched
+        until a machine already synced is found, starting with
+        a small window and widening it when every machine in the window
+        is new. Pages are validated before their records are stored, so
+        the catalog only holds records that parse, and each record is
+        stored along with its slim projection.
+
+        :param full: Revalidate and store the whole retired list rather
+         than stopping at the first known machine.
+
+        :return: Quantity of machines stored.
+
+        :raise Exception: When an unexpected error occurs.
+        """
+        try:
+            known_ids: set[int] = self.catalog.get_ids(
+                retired=True, synced=True
+            )
+            windows: list[int] = (
+                [sys.maxsize]
+                if full or not known_ids
+                else [self.sync_window, sys.maxsize]
+            )
+
+            records: list[dict[str, Any]] = []
+            slims: list[bytes] = []
+            for window in windows:
+                records: list[dict[str, Any]] = []
+                slims: list[bytes] = []
+                reached_known: bool = False
+                for page, digest in self.client.iter_pages(
+                    size=window, retired=True, update=full, parallel=full
+                ):
+                    machines: list[HtbMachine] = HtbParser.to_machine_list(
+                        page, digest
+                    )
+                    for record, machine in zip(page['data'], machines):
+                        if not full and record['id'] in known_ids:
+                            reached_known = True
+                            break
+                        records.append(record)
+                        slims.append(
+                            HtbMachineSlim(machine, record).to_bytes()
+                        )
+
+                    if reached_known:
+                        break
+
+                if reached_known or len(records) < window:
+                    break
+
+            self.catalog.upsert(records, retired=True, slims=slims)
+            return len(records)
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    def warm_up(self, size: int = 5) -> None:
+        """
+        Fetches the most used listings ahead of the first command: the
+        default active machines listing and the retired machines sync.
+        Cached responses already stale are served at once and refreshed
+        in background.
+
+        :param size: Quantity of active machines of the default listing.
+         Default is 5.
+
+        :raise Exception: When an unexpected error occurs.
+        """
+        try:
+            for _ in self.iter_machines(
+                size=size, update=False, retired=False
+            ):
+                pass
+
+            self.sync_retired()
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
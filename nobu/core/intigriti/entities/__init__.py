@@ -1,5 +1,13 @@
 from .intigriti_domain import IntigritiDomain
+from .intigriti_domain_change import IntigritiDomainChange
 from .intigriti_program import IntigritiProgram
 from .intigriti_program_slim import IntigritiProgramSlim
+from .intigriti_scope_match import IntigritiScopeMatch
 
-__all__ = ['IntigritiDomain', 'IntigritiProgram', 'IntigritiProgramSlim']
+__all__ = [
+    'IntigritiDomain',
+    'IntigritiDomainChange',
+    'IntigritiProgram',
+    'IntigritiProgramSlim',
+    'IntigritiScopeMatch',
+]
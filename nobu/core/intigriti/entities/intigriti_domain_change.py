@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+from .intigriti_domain import IntigritiDomain
+
+
+class IntigritiDomainChange(BaseModel):
+    program_id: str
+    program_name: str
+    change: str
+    domain: IntigritiDomain
+    previous: IntigritiDomain | None = None
@@ -7,6 +7,7 @@ class IntigritiProgram(BaseModel):
     id: str
     handle: str
     name: str
+    following: bool = False
     confidentiality_level: str = Field(
         validation_alias=AliasPath('confidentialityLevel', 'value')
     )
@@ -5,6 +5,7 @@ class IntigritiProgramSlim(BaseModel):
     id: str
     handle: str
     name: str
+    following: bool = False
     confidentiality_level: str = Field(
         validation_alias=AliasPath('confidentialityLevel', 'value')
     )
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+from .intigriti_domain import IntigritiDomain
+
+
+class IntigritiScopeMatch(BaseModel):
+    program_id: str
+    program_name: str
+    domain: IntigritiDomain
+    scope: str = 'in-scope'
+    limited: bool = False
@@ -1,11 +1,16 @@
+import ipaddress
 import logging
+import re
 from typing import Any
+from urllib.parse import SplitResult, urlsplit
 
 from .entities import IntigritiDomain, IntigritiProgram, IntigritiProgramSlim
 
 
 class IntigritiParser:
     _logger: logging.Logger = logging.getLogger(__name__)
+    _host_pattern: re.Pattern = re.compile(r'^[a-z0-9*_-]+(\.[a-z0-9*_-]+)*$')
+    non_host_types: tuple[str, ...] = ('android', 'device', 'ios', 'other')
 
     @classmethod
     def to_domains(
@@ -33,3 +38,62 @@ class IntigritiParser:
         cls, program_slim_dict: dict[str, Any]
     ) -> IntigritiProgramSlim:
         return IntigritiProgramSlim(**program_slim_dict)
+
+    @classmethod
+    def to_networks(
+        cls, endpoint: str
+    ) -> list[ipaddress.IPv4Network | ipaddress.IPv6Network]:
+        if endpoint.count('-') == 1:
+            first, last = endpoint.split('-')
+            try:
+                return list(
+                    ipaddress.summarize_address_range(
+                        ipaddress.ip_address(first.strip()),
+                        ipaddress.ip_address(last.strip()),
+                    )
+                )
+            except ValueError:
+                pass
+
+        try:
+            return [ipaddress.ip_network(endpoint, strict=False)]
+        except ValueError:
+            return []
+
+    @classmethod
+    def to_scope_targets(
+        cls, domain: IntigritiDomain
+    ) -> list[tuple[str, str]]:
+        endpoint: str = domain.endpoint.strip()
+        if (
+            not endpoint
+            or ' ' in endpoint
+            or domain.type.lower() in cls.non_host_types
+        ):
+            return []
+
+        networks: list[ipaddress.IPv4Network | ipaddress.IPv6Network] = (
+            cls.to_networks(endpoint)
+        )
+        if networks:
+            return [('cidr', str(network)) for network in networks]
+
+        try:
+            parts: SplitResult = urlsplit(
+                endpoint if '://' in endpoint else f'//{endpoint}'
+            )
+            host: str = (parts.hostname or '').rstrip('.')
+        except ValueError:
+            return []
+
+        if not cls._host_pattern.match(host):
+            return []
+
+        if parts.path.strip('/') or parts.query:
+            url: str = (
+                f'{parts.scheme or "https"}://{parts.netloc.lower()}'
+                f'{parts.path}{"?" + parts.query if parts.query else ""}'
+            )
+            return [('url', url)]
+
+        return [('wildcard' if '*' in host else 'host', host)]
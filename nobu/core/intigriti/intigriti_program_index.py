@@ -0,0 +1,125 @@
+import re
+from bisect import bisect_left
+from difflib import get_close_matches
+
+from .entities import IntigritiProgramSlim
+
+
+class IntigritiProgramIndex:
+    """
+    Indexes programs by the tokens of their name and handle, so every
+    program is searched in memory. Tokens are kept sorted, so the tokens
+    starting with a search term are found by bisection. Terms may also
+    match tokens approximately, to find programs despite typos.
+    """
+
+    def __init__(self, programs: list[IntigritiProgramSlim]) -> None:
+        """
+        Initializes IntigritiProgramIndex object attributes, indexing
+        the programs.
+
+        :param programs: Programs to be indexed, in the order search
+         results are returned when they rank the same.
+        """
+        self.programs: list[IntigritiProgramSlim] = programs
+        self._positions: dict[str, set[int]] = {}
+
+        for position, program in enumerate(programs):
+            tokens: list[str] = self.tokenize(
+                f'{program.name} {program.handle}'
+            )
+            tokens.append(''.join(self.tokenize(program.handle)))
+            for token in tokens:
+                self._positions.setdefault(token, set()).add(position)
+
+        self._tokens: list[str] = sorted(self._positions)
+
+    def __len__(self) -> int:
+        return len(self.programs)
+
+    @staticmethod
+    def tokenize(text: str) -> list[str]:
+        """
+        Splits a text into lowercase alphanumeric tokens.
+
+        :param text: Text to be split.
+
+        :return: List of tokens.
+        """
+        return re.findall(r'[a-z0-9]+', text.lower())
+
+    def _get_prefixed(self, prefix: str) -> list[str]:
+        """
+        Gets the indexed tokens starting with a prefix.
+
+        :param prefix: Token prefix.
+
+        :return: List of tokens.
+        """
+        tokens: list[str] = []
+        for index in range(
+            bisect_left(self._tokens, prefix), len(self._tokens)
+        ):
+            if not self._tokens[index].startswith(prefix):
+                break
+
+            tokens.append(self._tokens[index])
+
+        return tokens
+
+    def search(
+        self, query: str, fuzzy: bool = False
+    ) -> list[IntigritiProgramSlim]:
+        """
+        Searches programs having, for every term of a query, a token of
+        their name or handle starting with it. Programs matching terms
+        as whole tokens rank first.
+
+        :param query: Search terms.
+        :param fuzzy: Also match tokens close to the terms, such as
+         misspelled names.
+
+        :return: List of programs, best matches first.
+        """
+        terms: list[str] = self.tokenize(query)
+        if not terms:
+            return list(self.programs)
+
+        scores: dict[int, int] | None = None
+        for term in terms:
+            found: dict[int, int] = {}
+            tokens: list[str] = self._get_prefixed(term)
+            if fuzzy:
+                tokens.extend(
+                    token
+                    for token in get_close_matches(
+                        term, self._tokens, n=10, cutoff=0.75
+                    )
+                    if not token.startswith(term)
+                )
+
+            for token in tokens:
+                score: int = (
+                    3
+                    if token == term
+                    else (2 if token.startswith(term) else 1)
+                )
+                for position in self._positions[token]:
+                    found[position] = max(found.get(position, 0), score)
+
+            scores = (
+                found
+                if scores is None
+                else {
+                    position: scores[position] + score
+                    for position, score in found.items()
+                    if position in scores
+                }
+            )
+
+        return [
+            self.programs[position]
+            for position in sorted(
+                scores, key=lambda position: (-scores[position], position)
+            )
+        ]
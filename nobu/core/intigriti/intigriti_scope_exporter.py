@@ -0,0 +1,203 @@
+import ipaddress
+import json
+from pathlib import Path
+from typing import IO, Any, Iterable
+
+from .entities import IntigritiDomain, IntigritiProgram
+from .intigriti_parser import IntigritiParser
+
+
+class IntigritiScopeExporter:
+    """
+    Writes the scope of programs in formats recon tools read. Endpoints
+    are normalized into hosts, wildcards, URLs and CIDRs, duplicates are
+    dropped, overlapping IP ranges are merged and targets are split in
+    and out of scope by tier. Programs are written one at a time, so
+    only the targets already written are kept in memory, to drop
+    duplicates.
+
+    A directory gets a plain text file per scope and target kind, such
+    as in-scope/hosts.txt, with targets of every program merged. A JSON
+    Lines file gets an object per target of each program, with its tier
+    and type, so its duplicates are only dropped within each program: a
+    target shared by several programs is written once for each of them.
+    """
+
+    files: dict[str, str] = {
+        'cidr': 'cidrs.txt',
+        'host': 'hosts.txt',
+        'url': 'urls.txt',
+        'wildcard': 'wildcards.txt',
+    }
+    """Plain text file names by target kind."""
+
+    out_of_scope_tiers: tuple[str, ...] = ('out of scope',)
+    """Tiers of the domains out of scope, in lowercase."""
+
+    @classmethod
+    def _write_files(
+        cls, path: Path, programs: Iterable[IntigritiProgram]
+    ) -> tuple[int, int]:
+        """
+        Writes the scope of programs to a plain text file per scope and
+        target kind, merged across programs, replacing the files of an
+        earlier export. Networks are merged and written once every
+        program is read.
+
+        :param path: Directory path.
+        :param programs: An iterator over programs with their domains.
+
+        :return: Quantity of programs and of targets written.
+        """
+        files: dict[tuple[str, str], IO[str]] = {}
+        written: dict[tuple[str, str], set[str]] = {}
+        networks: dict[
+            str, list[ipaddress.IPv4Network | ipaddress.IPv6Network]
+        ] = {}
+        count: int = 0
+
+        for scope in ('in-scope', 'out-of-scope'):
+            for name in cls.files.values():
+                (path / scope / name).unlink(missing_ok=True)
+
+        def write_target(scope: str, kind: str, target: str) -> None:
+            seen: set[str] = written.setdefault((scope, kind), set())
+            if target in seen:
+                return
+
+            if (scope, kind) not in files:
+                (path / scope).mkdir(parents=True, exist_ok=True)
+                files[scope, kind] = (path / scope / cls.files[kind]).open(
+                    'w', encoding='utf-8'
+                )
+
+            seen.add(target)
+            files[scope, kind].write(target + '\n')
+
+        try:
+            for program in programs:
+                count += 1
+                for row in cls.to_rows(program):
+                    if row['kind'] == 'cidr':
+                        networks.setdefault(row['scope'], []).append(
+                            ipaddress.ip_network(row['target'])
+                        )
+                    else:
+                        write_target(row['scope'], row['kind'], row['target'])
+
+            for scope, found in networks.items():
+                for version in (4, 6):
+                    for network in ipaddress.collapse_addresses(
+                        network
+                        for network in found
+                        if network.version == version
+                    ):
+                        write_target(scope, 'cidr', str(network))
+
+        finally:
+            for file in files.values():
+                file.close()
+
+        return count, sum(len(seen) for seen in written.values())
+
+    @classmethod
+    def get_scope(cls, domain: IntigritiDomain) -> str:
+        """
+        Gets whether a domain is in or out of scope.
+
+        :param domain: Domain object.
+
+        :return: Either "in-scope" or "out-of-scope".
+        """
+        return (
+            'out-of-scope'
+            if domain.tier.lower() in cls.out_of_scope_tiers
+            else 'in-scope'
+        )
+
+    @classmethod
+    def to_rows(cls, program: IntigritiProgram) -> list[dict[str, Any]]:
+        """
+        Normalizes the domains of a program into targets, dropping
+        duplicates and merging overlapping networks of the same scope
+        and tier.
+
+        :param program: Program with its domains.
+
+        :return: List of dictionaries with a target each.
+        """
+        rows: dict[tuple[str, str, str], dict[str, Any]] = {}
+        networks: dict[
+            tuple[str, str, str],
+            list[ipaddress.IPv4Network | ipaddress.IPv6Network],
+        ] = {}
+
+        for domain in program.domains:
+            scope: str = cls.get_scope(domain)
+            for kind, target in IntigritiParser.to_scope_targets(domain):
+                if kind == 'cidr':
+                    networks.setdefault(
+                        (scope, domain.tier, domain.type), []
+                    ).append(ipaddress.ip_network(target))
+                    continue
+
+                rows.setdefault(
+                    (scope, kind, target),
+                    {
+                        'program_id': program.id,
+                        'program': program.name,
+                        'scope': scope,
+                        'kind': kind,
+                        'target': target,
+                        'tier': domain.tier,
+                        'type': domain.type,
+                    },
+                )
+
+        for (scope, tier, domain_type), found in networks.items():
+            for version in (4, 6):
+                for network in ipaddress.collapse_addresses(
+                    network for network in found if network.version == version
+                ):
+                    rows.setdefault(
+                        (scope, 'cidr', str(network)),
+                        {
+                            'program_id': program.id,
+                            'program': program.name,
+                            'scope': scope,
+                            'kind': 'cidr',
+                            'target': str(network),
+                            'tier': tier,
+                            'type': domain_type,
+                        },
+                    )
+
+        return list(rows.values())
+
+    @classmethod
+    def write(
+        cls, path: Path, programs: Iterable[IntigritiProgram]
+    ) -> tuple[int, int]:
+        """
+        Writes the scope of programs, one program at a time.
+
+        :param path: A JSON Lines file path, ending with .jsonl, or a
+         directory path for plain text files.
+        :param programs: An iterator over programs with their domains.
+
+        :return: Quantity of programs and of targets written.
+        """
+        if path.suffix.lower() == '.jsonl':
+            path.parent.mkdir(parents=True, exist_ok=True)
+            count: int = 0
+            targets: int = 0
+            with path.open('w', encoding='utf-8') as file:
+                for program in programs:
+                    rows: list[dict[str, Any]] = cls.to_rows(program)
+                    file.writelines(json.dumps(row) + '\n' for row in rows)
+                    count += 1
+                    targets += len(rows)
+
+            return count, targets
+
+        return cls._write_files(path, programs)
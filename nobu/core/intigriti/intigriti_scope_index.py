@@ -0,0 +1,203 @@
+import ipaddress
+from fnmatch import fnmatchcase
+from typing import Any
+from urllib.parse import urlsplit
+
+from .entities import IntigritiProgram, IntigritiScopeMatch
+from .intigriti_parser import IntigritiParser
+from .intigriti_scope_exporter import IntigritiScopeExporter
+
+
+class IntigritiScopeIndex:
+    """
+    Indexes the scope of many programs, to find which programs have a
+    host in scope without checking every domain. Hosts and wildcards
+    are kept in a trie of reversed labels, so a lookup walks one node
+    per label of the host. Networks are kept by prefix length, so an
+    address is looked up once per prefix length in use. Wildcards with
+    a "*" anywhere but as the first label are matched one by one.
+
+    Domains out of scope are indexed too, so the most specific domain of
+    a program decides whether it has a host in scope: a host out of
+    scope overrides the wildcards and networks in scope covering it.
+    URLs only have their path in scope, so their matches are flagged as
+    limited and never put the whole host in scope.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes IntigritiScopeIndex object attributes.
+        """
+        self.programs: int = 0
+        self._labels: dict[Any, Any] = {}
+        self._networks: dict[
+            tuple[int, int], dict[int, list[IntigritiScopeMatch]]
+        ] = {}
+        self._patterns: list[tuple[str, IntigritiScopeMatch]] = []
+
+    @staticmethod
+    def to_host(value: str) -> str | None:
+        """
+        Gets the host of a hostname, an address or a URL.
+
+        :param value: Hostname, address or URL, with or without a port.
+
+        :return: Lowercase host, or None if there is none.
+        """
+        value: str = value.strip()
+        try:
+            host: str | None = urlsplit(
+                value if '://' in value else f'//{value}'
+            ).hostname
+        except ValueError:
+            return None
+
+        return host.rstrip('.') if host else None
+
+    def _add_host(self, host: str, match: IntigritiScopeMatch) -> None:
+        """
+        Adds a host or a wildcard to the index.
+
+        :param host: Lowercase host or wildcard.
+        :param match: Match returned for the hosts it covers.
+        """
+        labels: list[str] = host.split('.')
+        if '*' in ''.join(labels[1:]) or (
+            '*' in labels[0] and labels[0] != '*'
+        ):
+            self._patterns.append((host, match))
+            return
+
+        node: dict[Any, Any] = self._labels
+        for label in reversed(labels):
+            node = node.setdefault(label, {})
+
+        node.setdefault(None, []).append(match)
+
+    def _add_network(
+        self,
+        network: ipaddress.IPv4Network | ipaddress.IPv6Network,
+        match: IntigritiScopeMatch,
+    ) -> None:
+        """
+        Adds a network to the index.
+
+        :param network: Network in scope.
+        :param match: Match returned for the addresses it covers.
+        """
+        shift: int = network.max_prefixlen - network.prefixlen
+        self._networks.setdefault(
+            (network.version, network.prefixlen), {}
+        ).setdefault(int(network.network_address) >> shift, []).append(match)
+
+    @staticmethod
+    def _resolve(
+        matches: list[IntigritiScopeMatch],
+    ) -> list[IntigritiScopeMatch]:
+        """
+        Leaves out the matches in scope of programs whose most specific
+        match, other than URLs, is out of scope.
+
+        :param matches: Matching domains, from the most to the least
+         specific.
+
+        :return: Remaining matching domains, in the same order.
+        """
+        scopes: dict[str, str] = {}
+        for match in matches:
+            if not match.limited:
+                scopes.setdefault(match.program_id, match.scope)
+
+        return [
+            match
+            for match in matches
+            if match.scope != 'in-scope'
+            or scopes.get(match.program_id, 'in-scope') == 'in-scope'
+        ]
+
+    def add(self, program: IntigritiProgram) -> None:
+        """
+        Adds the domains of a program to the index, in and out of
+        scope. Domains that are not hosts, wildcards, URLs or networks,
+        such as mobile applications, are skipped.
+
+        :param program: Program with its domains.
+        """
+        for domain in program.domains:
+            scope: str = IntigritiScopeExporter.get_scope(domain)
+            for kind, target in IntigritiParser.to_scope_targets(domain):
+                match: IntigritiScopeMatch = IntigritiScopeMatch(
+                    program_id=program.id,
+                    program_name=program.name,
+                    domain=domain,
+                    scope=scope,
+                    limited=kind == 'url',
+                )
+                if kind == 'cidr':
+                    self._add_network(ipaddress.ip_network(target), match)
+                else:
+                    self._add_host(self.to_host(target), match)
+
+        self.programs += 1
+
+    def lookup(self, value: str) -> list[IntigritiScopeMatch]:
+        """
+        Finds the domains covering a host. A wildcard such as
+        "*.example.com" covers every subdomain of example.com, at any
+        depth, but not example.com itself. The most specific domain of
+        each program, other than URLs, decides its scope: when it is out
+        of scope, the less specific domains in scope of the program are
+        left out.
+
+        :param value: Hostname, address or URL.
+
+        :return: Matching domains, exact hosts first, then wildcards and
+         networks from the most to the least specific.
+        """
+        host: str | None = self.to_host(value)
+        if not host:
+            return []
+
+        address: ipaddress.IPv4Address | ipaddress.IPv6Address | None = None
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            pass
+
+        if address:
+            matches: list[IntigritiScopeMatch] = []
+            for (version, prefixlen), networks in sorted(
+                self._networks.items(), key=lambda item: -item[0][1]
+            ):
+                if version == address.version:
+                    matches.extend(
+                        networks.get(
+                            int(address)
+                            >> (address.max_prefixlen - prefixlen),
+                            [],
+                        )
+                    )
+
+            return self._resolve(matches)
+
+        wildcards: list[list[IntigritiScopeMatch]] = []
+        node: dict[Any, Any] | None = self._labels
+        for label in reversed(host.split('.')):
+            if '*' in node:
+                wildcards.append(node['*'].get(None, []))
+
+            node = node.get(label)
+            if node is None:
+                break
+
+        matches: list[IntigritiScopeMatch] = list((node or {}).get(None, []))
+        for found in reversed(wildcards):
+            matches.extend(found)
+
+        matches.extend(
+            match
+            for pattern, match in self._patterns
+            if fnmatchcase(host, pattern)
+        )
+
+        return self._resolve(matches)
@@ -1,14 +1,40 @@
 import logging
-from typing import Any
+import sys
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
 
 from nobu.clients.intigriti import IntigritiClient
+from nobu.clients.session import SessionFactory
+from nobu.commons import DictUtils, Prefetcher, StaleCache
 from nobu.settings import Settings
 
-from .entities import IntigritiProgram, IntigritiProgramSlim
+from .entities import (
+    IntigritiDomain,
+    IntigritiDomainChange,
+    IntigritiProgram,
+    IntigritiProgramSlim,
+    IntigritiScopeMatch,
+)
 from .intigriti_parser import IntigritiParser
+from .intigriti_program_index import IntigritiProgramIndex
+from .intigriti_scope_exporter import IntigritiScopeExporter
+from .intigriti_scope_index import IntigritiScopeIndex
+from .intigriti_snapshot_store import IntigritiSnapshotStore
 
 
 class IntigritiService:
+    programs: StaleCache | None = None
+    details: StaleCache | None = None
+    indexes: StaleCache | None = None
+    scopes: StaleCache | None = None
+    prefetcher: Prefetcher | None = None
+    _shared_lock: threading.Lock = threading.Lock()
+
     def __init__(self) -> None:
         """
         Initializes all IntigritiService object attributes.
@@ -28,7 +54,359 @@ class IntigritiService:
         if not self.token:
             raise ValueError('could not find Intigriti token')
 
-        self.client = IntigritiClient(token=self.token)
+        self._create_shared(self.settings)
+        self.client = IntigritiClient(
+            token=self.token,
+            timeout=self.settings.http_timeout,
+            session=SessionFactory.get_session(
+                pool_size=self.settings.http_pool_size,
+                retries=self.settings.http_retries,
+                backoff_factor=self.settings.http_backoff_factor,
+                cache_backend=self.settings.cache_backend,
+                cache_name=self.settings.cache_name,
+                cache_max_bytes=self.settings.cache_max_bytes,
+                cache_compress=self.settings.cache_compress,
+                cache_stale_while_revalidate=(
+                    self.settings.cache_stale_while_revalidate
+                ),
+            ),
+        )
+        self.snapshots: IntigritiSnapshotStore = IntigritiSnapshotStore(
+            Path(self.settings.data_dir) / 'intigriti.sqlite'
+        )
+
+    @classmethod
+    def _create_shared(cls, settings: Settings) -> None:
+        """
+        Creates the session caches and the prefetcher shared by every
+        service, once, when the first service is created, so settings
+        are not read when the module is imported.
+
+        :param settings: Application settings.
+        """
+        with cls._shared_lock:
+            if cls.prefetcher:
+                return
+
+            stale_ttl: timedelta = timedelta(
+                seconds=settings.cache_stale_while_revalidate
+            )
+            cls.programs = StaleCache(
+                ttl=timedelta(minutes=5), stale_ttl=stale_ttl
+            )
+            cls.details = StaleCache(
+                ttl=timedelta(minutes=30), stale_ttl=stale_ttl
+            )
+            cls.indexes = StaleCache(
+                ttl=timedelta(minutes=5), stale_ttl=stale_ttl
+            )
+            cls.scopes = StaleCache(
+                ttl=timedelta(minutes=30), stale_ttl=stale_ttl
+            )
+            cls.prefetcher = Prefetcher(
+                max_workers=settings.intigriti_prefetch_workers
+            )
+
+    @classmethod
+    def _diff_domains(
+        cls,
+        program: dict[str, Any],
+        digests: dict[str, str],
+        previous: dict[str, tuple[str, dict[str, Any]]],
+    ) -> list[IntigritiDomainChange]:
+        """
+        Compares the domains of a program with its last snapshot, by
+        their digests.
+
+        :param program: Raw program details record.
+        :param digests: Digests of the current domains, by domain
+         identifier.
+        :param previous: Digest and raw record of each domain of the
+         last snapshot, by domain identifier.
+
+        :return: Added, modified and removed domains, in this order and
+         sorted by endpoint.
+        """
+        current: dict[str, dict[str, Any]] = {
+            domain['id']: domain
+            for domain in (program.get('domains') or {}).get('content') or []
+        }
+        changes: list[IntigritiDomainChange] = []
+
+        for domain_id, domain in current.items():
+            if domain_id not in previous:
+                changes.append(
+                    IntigritiDomainChange(
+                        program_id=program['id'],
+                        program_name=program['name'],
+                        change='added',
+                        domain=IntigritiDomain(**domain),
+                    )
+                )
+            elif digests[domain_id] != previous[domain_id][0]:
+                changes.append(
+                    IntigritiDomainChange(
+                        program_id=program['id'],
+                        program_name=program['name'],
+                        change='modified',
+                        domain=IntigritiDomain(**domain),
+                        previous=IntigritiDomain(**previous[domain_id][1]),
+                    )
+                )
+
+        for domain_id, (_, domain) in previous.items():
+            if domain_id not in current:
+                changes.append(
+                    IntigritiDomainChange(
+                        program_id=program['id'],
+                        program_name=program['name'],
+                        change='removed',
+                        domain=IntigritiDomain(**domain),
+                    )
+                )
+
+        order: dict[str, int] = {'added': 0, 'modified': 1, 'removed': 2}
+        changes.sort(
+            key=lambda change: (order[change.change], change.domain.endpoint)
+        )
+
+        return changes
+
+    def _build_program_index(
+        self,
+        following: bool | None,
+        match_status: int | None,
+        match_type: int | None,
+        update: bool = False,
+    ) -> IntigritiProgramIndex:
+        """
+        Builds the search index of every listed program. The listing is
+        fetched from Intigriti, rather than from the listing cache or
+        the HTTP cache, as either may serve a stale listing while the
+        index is already being built again for being stale.
+
+        :param following: Index only programs that you're following.
+        :param match_status: Index programs with specified status ID.
+        :param match_type: Index programs with specified type ID.
+        :param update: Whether the index is built again. The listing is
+         fetched from Intigriti either way.
+
+        :return: The program index.
+        """
+        return IntigritiProgramIndex(
+            self._fetch_programs(
+                following=following,
+                limit=sys.maxsize,
+                match_status=match_status,
+                match_type=match_type,
+                offset=0,
+                update=True,
+            )
+        )
+
+    def _build_scope_index(
+        self, following: bool | None, update: bool = False
+    ) -> IntigritiScopeIndex:
+        """
+        Builds the scope index of the listed programs. The listing is
+        fetched from Intigriti, rather than from the listing cache or
+        the HTTP cache, and details are fetched in parallel, without
+        going through the detail cache.
+
+        :param following: Index only programs that you're following.
+        :param update: Fetch the details from Intigriti, rather than
+         from the HTTP cache.
+
+        :return: The scope index.
+        """
+        programs: list[IntigritiProgramSlim] = self._fetch_programs(
+            following=following,
+            limit=sys.maxsize,
+            match_status=None,
+            match_type=None,
+            offset=0,
+            update=True,
+        )
+
+        index: IntigritiScopeIndex = IntigritiScopeIndex()
+        for program in self._iter_programs(
+            [program.id for program in programs], update=update
+        ):
+            index.add(program)
+
+        return index
+
+    def _fetch_program(
+        self, program_id: str, update: bool = False
+    ) -> IntigritiProgram:
+        """
+        Fetches the details of a program.
+
+        :param program_id: Program identifier.
+        :param update: Fetch the details from Intigriti, rather than
+         from the HTTP cache.
+
+        :return: A program with its information.
+        """
+        response: dict[str, Any] = self.client.get_program_details(
+            program_id=program_id, update=update
+        )
+
+        return IntigritiParser.to_program(response)
+
+    def _fetch_programs(
+        self,
+        following: bool | None,
+        limit: int,
+        match_status: int | None,
+        match_type: int | None,
+        offset: int,
+        update: bool = False,
+    ) -> list[IntigritiProgramSlim]:
+        """
+        Fetches a listing of programs, sorted by name.
+
+        :param following: Return only programs that you're following.
+        :param limit: Limit of programs to be returned.
+        :param match_status: Return programs with specified status ID.
+        :param match_type: Return programs with specified type ID.
+        :param offset: Get programs starting by the specified offset.
+        :param update: Fetch the listing from Intigriti, rather than
+         from the HTTP cache.
+
+        :return: A list of programs.
+        """
+        records: list[dict[str, Any]] = self.client.get_all_programs(
+            following=following,
+            limit=limit,
+            offset=offset,
+            status_id=match_status,
+            type_id=match_type,
+            update=update,
+        )
+
+        programs: list[IntigritiProgramSlim] = [
+            IntigritiParser.to_program_slim(record) for record in records
+        ]
+        programs.sort()
+
+        return programs
+
+    def _get_program_loader(
+        self, program_id: str
+    ) -> tuple[tuple[Any, ...], Callable[[bool], IntigritiProgram]]:
+        """
+        Builds the cache key and the loader of program details. Updates
+        fetch the details from Intigriti, rather than from the HTTP
+        cache, which may serve them stale.
+
+        :param program_id: Program identifier.
+
+        :return: The details cache key and its loader.
+        """
+        key: tuple[Any, ...] = (self.token, program_id)
+
+        return key, partial(self._fetch_program, program_id)
+
+    def _get_programs_loader(
+        self,
+        following: bool | None = None,
+        limit: int | None = None,
+        match_status: int | None = None,
+        match_type: int | None = None,
+        offset: int | None = None,
+    ) -> tuple[tuple[Any, ...], Callable[[bool], list[IntigritiProgramSlim]]]:
+        """
+        Builds the cache key and the loader of a program listing.
+        Updates fetch the listing from Intigriti, rather than from the
+        HTTP cache, which may serve it stale.
+
+        :param following: Return only programs that you're following.
+        :param limit: Limit of programs to be returned. Default is 50.
+        :param match_status: Return programs with specified status ID.
+        :param match_type: Return programs with specified type ID.
+        :param offset: Get programs starting by the specified offset.
+         Default is 0.
+
+        :return: The listing cache key and its loader.
+        """
+        limit: int = 50 if not limit else limit
+        offset: int = 0 if not offset else offset
+        key: tuple[Any, ...] = (
+            self.token,
+            following,
+            limit,
+            match_status,
+            match_type,
+            offset,
+        )
+
+        return key, partial(
+            self._fetch_programs,
+            following,
+            limit,
+            match_status,
+            match_type,
+            offset,
+        )
+
+    def get_scope_index(
+        self, following: bool | None = True, update: bool = False
+    ) -> IntigritiScopeIndex:
+        """
+        Gets the scope index of the programs, kept for the session: an
+        index older than 30 minutes is still served at once while it is
+        built again in background.
+
+        :param following: Index only programs that you're following.
+         Default is True.
+        :param update: Build the index again from Intigriti and wait for
+         it, rather than serving it from the caches.
+
+        :return: The scope index.
+
+        :raise Exception: When an unexpected error occurs.
+        """
+        try:
+            return IntigritiService.scopes.get(
+                (self.token, following),
+                partial(self._build_scope_index, following),
+                update=update,
+            )
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    def _iter_programs(
+        self, program_ids: list[str], update: bool = False
+    ) -> Iterator[IntigritiProgram]:
+        """
+        Fetches the details of programs in parallel, in order. Only a
+        few details more than the workers are fetched ahead of the ones
+        consumed, and none is kept in the detail cache, so memory does
+        not grow with the quantity of programs.
+
+        :param program_ids: Program identifiers.
+        :param update: Fetch the details from Intigriti, rather than
+         from the HTTP cache.
+
+        :return: An iterator over programs with their information.
+        """
+        window: int = self.client.max_workers * 2
+        futures: deque[Future] = deque()
+        with ThreadPoolExecutor(
+            max_workers=self.client.max_workers
+        ) as executor:
+            for program_id in program_ids:
+                futures.append(
+                    executor.submit(self._fetch_program, program_id, update)
+                )
+                if len(futures) >= window:
+                    yield futures.popleft().result()
+
+            while futures:
+                yield futures.popleft().result()
 
     def list_programs(
         self,
@@ -38,69 +416,343 @@ class IntigritiService:
         match_type: int | None = None,
         offset: int | None = None,
         search: str | None = None,
+        update: bool = False,
+        fuzzy: bool = False,
     ) -> list[IntigritiProgramSlim]:
         """
-        Lists all Intigriti programs for your user.
+        Lists all Intigriti programs for your user. Listings are kept
+        for the session: a listing older than 5 minutes is still served
+        at once while it is fetched again in background. Searches look
+        up an index of every program, kept the same way, and the limit
+        and offset apply to the search results.
 
         :param following: Return only programs that you're following.
-        :param limit: Limit of programs to be returned.
+        :param limit: Limit of programs to be returned. Default is 50,
+         and ``sys.maxsize`` returns every program.
         :param match_status: Return programs with specified status ID.
         :param match_type: Return programs with specified type ID.
         :param offset: Get programs starting by the specified offset.
-        :param search: Filter by specified name.
+        :param search: Search programs whose name or handle has words
+         starting with the specified terms.
+        :param update: Fetch the listing from Intigriti and wait for it,
+         rather than serving it from the caches.
+        :param fuzzy: Also match words close to the search terms.
 
         :return: A list of programs.
 
         :raise Exception: When an unexpected error occurs.
         """
         try:
-            limit: int = 50 if not limit else limit
-            offset: int = 0 if not offset else offset
+            if search:
+                limit: int = 50 if not limit else limit
+                offset: int = 0 if not offset else offset
+                index: IntigritiProgramIndex = IntigritiService.indexes.get(
+                    (self.token, following, match_status, match_type),
+                    partial(
+                        self._build_program_index,
+                        following,
+                        match_status,
+                        match_type,
+                    ),
+                    update=update,
+                )
 
-            records: list[dict[str, Any]] = self.client.get_all_programs(
+                return index.search(search, fuzzy=fuzzy)[
+                    offset : offset + limit
+                ]
+
+            key, loader = self._get_programs_loader(
                 following=following,
                 limit=limit,
+                match_status=match_status,
+                match_type=match_type,
                 offset=offset,
-                status_id=match_status,
-                type_id=match_type,
             )
+            programs: list[IntigritiProgramSlim] = (
+                IntigritiService.programs.get(key, loader, update=update)
+            )
+
+            return list(programs)
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    @classmethod
+    def cancel_prefetch(cls) -> None:
+        """
+        Cancels the pending prefetch of program details, if any service
+        started one.
+        """
+        if cls.prefetcher:
+            cls.prefetcher.cancel()
+
+    def detect_changes(
+        self, following: bool | None = None, checks: int = 10
+    ) -> tuple[int, list[IntigritiDomainChange]]:
+        """
+        Refreshes the program listing and detects the scope changes since
+        the last snapshots. Details are fetched again only for programs
+        whose listing record changed or that have no snapshot yet, and
+        for the programs checked the longest time ago, a few per run, as
+        the listing does not tell when a scope changes. Domains are only
+        compared when the digest of the whole domain set changed. The
+        first run only takes the snapshots, without reporting any
+        change.
+
+        When every program is checked, programs that left the listing
+        have all of their domains reported as removed and their
+        snapshots are dropped. When only followed programs are checked,
+        the snapshots of programs missing from the listing are kept, as
+        they may just be unfollowed.
+
+        :param following: Check only programs that you're following.
+        :param checks: Maximum quantity of unchanged programs checked
+         again, the ones checked the longest time ago first. Default is
+         10.
+
+        :return: Quantity of programs checked and the domain changes,
+         grouped by program.
+
+        :raise Exception: When an unexpected error occurs.
+        """
+        try:
+            records: list[dict[str, Any]] = self.client.get_all_programs(
+                following=following, limit=sys.maxsize, update=True
+            )
+            snapshots: dict[str, tuple[str, str, float, str]] = (
+                self.snapshots.get_programs()
+            )
+            summaries: dict[str, str] = {
+                record['id']: DictUtils.get_digest(record)
+                for record in records
+            }
 
-            programs: list[IntigritiProgramSlim] = [
-                IntigritiParser.to_program_slim(record) for record in records
+            changed: list[str] = [
+                program_id
+                for program_id, summary in summaries.items()
+                if program_id not in snapshots
+                or snapshots[program_id][0] != summary
             ]
+            unchanged: list[str] = sorted(
+                set(summaries) - set(changed),
+                key=lambda program_id: snapshots[program_id][2],
+            )
+            program_ids: list[str] = changed + unchanged[:checks]
 
-            programs.sort()
+            changes: list[IntigritiDomainChange] = []
+            with ThreadPoolExecutor(
+                max_workers=self.client.max_workers
+            ) as executor:
+                programs: Iterator[dict[str, Any]] = executor.map(
+                    lambda program_id: self.client.get_program_details(
+                        program_id=program_id, update=True
+                    ),
+                    program_ids,
+                )
 
-            filtered_programs: list[IntigritiProgramSlim] = []
+                for program in programs:
+                    digests: dict[str, str] = (
+                        IntigritiSnapshotStore.get_domain_digests(program)
+                    )
+                    if snapshots and (
+                        program['id'] not in snapshots
+                        or snapshots[program['id']][1]
+                        != DictUtils.get_digest(digests)
+                    ):
+                        changes.extend(
+                            self._diff_domains(
+                                program,
+                                digests,
+                                self.snapshots.get_domains(program['id']),
+                            )
+                        )
 
-            if search:
-                [
-                    filtered_programs.append(program)
-                    for program in programs
-                    if search.lower() in program.name.lower()
+                    self.snapshots.set(
+                        program, summaries[program['id']], digests
+                    )
+
+            if following is None:
+                left: list[str] = sorted(set(snapshots) - set(summaries))
+                for program_id in left:
+                    changes.extend(
+                        IntigritiDomainChange(
+                            program_id=program_id,
+                            program_name=snapshots[program_id][3],
+                            change='removed',
+                            domain=IntigritiDomain(**domain),
+                        )
+                        for _, domain in sorted(
+                            self.snapshots.get_domains(program_id).values(),
+                            key=lambda row: row[1]['endpoint'],
+                        )
+                    )
+                self.snapshots.remove(left)
+
+            return len(program_ids), changes
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    def export_scopes(
+        self,
+        path: Path,
+        program_id: str | None = None,
+        following: bool | None = True,
+        update: bool = False,
+    ) -> tuple[int, int]:
+        """
+        Exports the normalized scope of programs, to a JSON Lines file or
+        to a plain text file per scope and target kind. Details are
+        fetched in parallel, a bounded window ahead of the writer, and
+        programs are written as they are read, without being kept in
+        the detail cache.
+
+        :param path: A JSON Lines file path, ending with .jsonl, or a
+         directory path for plain text files.
+        :param program_id: Export only this program. If None, every
+         listed program is exported.
+        :param following: Export only programs that you're following.
+         Default is True.
+        :param update: Fetch the listing and the details from Intigriti,
+         rather than from the caches.
+
+        :return: Quantity of programs and of targets exported.
+
+        :raise Exception: When an unexpected error occurs.
+        """
+        try:
+            program_ids: list[str] = (
+                [program_id]
+                if program_id
+                else [
+                    program.id
+                    for program in self.list_programs(
+                        following=following, limit=sys.maxsize, update=update
+                    )
                 ]
-                return filtered_programs
+            )
 
-            return programs
+            return IntigritiScopeExporter.write(
+                path, self._iter_programs(program_ids, update=update)
+            )
 
         except Exception as ex:
             self.logger.exception(str(ex), exc_info=True)
             raise
 
-    def get_program(self, program_id: str) -> IntigritiProgram:
+    def get_program(
+        self, program_id: str, update: bool = False
+    ) -> IntigritiProgram:
         """
-        Gets program information.
+        Gets program information. Details are kept for the session, and
+        are usually already in memory when they were prefetched: details
+        older than 30 minutes are still served at once while they are
+        fetched again in background.
+
+        :param program_id: Program identifier.
+        :param update: Fetch the details from Intigriti and wait for
+         them, rather than serving them from the caches.
 
         :return: A program with its information.
 
         :raise Exception: When an unexpected error occurs.
         """
         try:
-            response: dict[str, Any] = self.client.get_program_details(
-                program_id=program_id
+            key, loader = self._get_program_loader(program_id=program_id)
+
+            return IntigritiService.details.get(key, loader, update=update)
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    def lookup_scopes(
+        self,
+        hosts: Iterable[str],
+        following: bool | None = True,
+        update: bool = False,
+    ) -> Iterator[tuple[str, list[IntigritiScopeMatch]]]:
+        """
+        Finds the programs having each host in scope. Hosts are looked
+        up one at a time, so an iterator over a file is read as the
+        results are consumed. Blank lines and lines starting with "#"
+        are skipped.
+
+        :param hosts: Hostnames, addresses or URLs, such as the lines of
+         a file.
+        :param following: Look up only programs that you're following.
+         Default is True.
+        :param update: Build the scope index again from Intigriti before
+         the lookups.
+
+        :return: An iterator over each host and its matching domains.
+
+        :raise Exception: When an unexpected error occurs.
+        """
+        try:
+            index: IntigritiScopeIndex = self.get_scope_index(
+                following=following, update=update
             )
+            for line in hosts:
+                host: str = line.strip()
+                if host and not host.startswith('#'):
+                    yield host, index.lookup(host)
 
-            return IntigritiParser.to_program(response)
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    def prefetch_programs(
+        self,
+        programs: list[IntigritiProgramSlim],
+        size: int | None = None,
+    ) -> int:
+        """
+        Loads the details of listed programs in background, followed
+        programs first and then in listing order, so they are usually in
+        memory when they are opened. Loads pending from an earlier
+        listing are cancelled first.
+
+        :param programs: Listed programs.
+        :param size: Maximum quantity of programs to be prefetched.
+         Default is the intigriti_prefetch_size setting.
+
+        :return: Quantity of programs submitted.
+
+        :raise Exception: When an unexpected error occurs.
+        """
+        try:
+            size: int = (
+                self.settings.intigriti_prefetch_size if size is None else size
+            )
+            ordered: list[IntigritiProgramSlim] = sorted(
+                programs, key=lambda program: not program.following
+            )[:size]
+
+            IntigritiService.prefetcher.cancel()
+            IntigritiService.prefetcher.submit(
+                partial(
+                    IntigritiService.details.fill,
+                    *self._get_program_loader(program.id),
+                )
+                for program in ordered
+            )
+
+            return len(ordered)
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
+
+    def warm_up(self) -> None:
+        """
+        Loads the default program listing in background, unless it is
+        fresh, so the first listing of a session is served at once.
+        """
+        try:
+            IntigritiService.programs.warm(*self._get_programs_loader())
 
         except Exception as ex:
             self.logger.exception(str(ex), exc_info=True)
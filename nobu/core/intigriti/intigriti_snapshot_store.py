@@ -0,0 +1,177 @@
+import json
+import sqlite3
+import time
+from typing import Any
+
+from nobu.commons import DictUtils, SqliteStore
+
+
+class IntigritiSnapshotStore(SqliteStore):
+    """
+    Local store of the last known scope of each Intigriti program. A
+    program keeps the digest of its listing record, the digest of its
+    whole domain set and the time it was last checked, and each domain
+    keeps its own digest and raw record. Programs whose listing record
+    did not change can be skipped, and an unchanged domain set is
+    detected with a single comparison.
+    """
+
+    def create_tables(self, connection: sqlite3.Connection) -> None:
+        """
+        Creates the snapshot tables if they do not exist.
+
+        :param connection: Database connection.
+        """
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS programs ('
+            '    id TEXT PRIMARY KEY,'
+            '    name TEXT NOT NULL,'
+            '    summary TEXT NOT NULL,'
+            '    digest TEXT NOT NULL,'
+            '    checked_at REAL NOT NULL'
+            ') WITHOUT ROWID'
+        )
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS domains ('
+            '    program_id TEXT NOT NULL,'
+            '    id TEXT NOT NULL,'
+            '    digest TEXT NOT NULL,'
+            '    data TEXT NOT NULL,'
+            '    PRIMARY KEY (program_id, id)'
+            ') WITHOUT ROWID'
+        )
+
+    @classmethod
+    def get_domain_digests(cls, program: dict[str, Any]) -> dict[str, str]:
+        """
+        Computes the digest of each domain of a program.
+
+        :param program: Raw program details record.
+
+        :return: Domain digests by domain identifier.
+        """
+        return {
+            domain['id']: DictUtils.get_digest(domain)
+            for domain in (program.get('domains') or {}).get('content') or []
+        }
+
+    def get_domains(
+        self, program_id: str
+    ) -> dict[str, tuple[str, dict[str, Any]]]:
+        """
+        Gets the domains of a program snapshot.
+
+        :param program_id: Program identifier.
+
+        :return: Digest and raw record of each domain, by domain
+         identifier.
+        """
+        with self._lock:
+            rows: list[tuple[str, str, str]] = self._connection.execute(
+                'SELECT id, digest, data FROM domains WHERE program_id = ?',
+                (program_id,),
+            ).fetchall()
+
+        return {
+            domain_id: (digest, json.loads(data))
+            for domain_id, digest, data in rows
+        }
+
+    def get_programs(self) -> dict[str, tuple[str, str, float, str]]:
+        """
+        Gets the digests of every program snapshot.
+
+        :return: Listing record digest, domain set digest, last check
+         time and name by program identifier.
+        """
+        with self._lock:
+            rows: list[tuple[str, str, str, float, str]] = (
+                self._connection.execute(
+                    'SELECT id, summary, digest, checked_at, name '
+                    'FROM programs'
+                ).fetchall()
+            )
+
+        return {
+            program_id: (summary, digest, checked_at, name)
+            for program_id, summary, digest, checked_at, name in rows
+        }
+
+    def remove(self, program_ids: list[str]) -> None:
+        """
+        Removes the snapshots of programs.
+
+        :param program_ids: Program identifiers.
+        """
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                self._connection.executemany(
+                    'DELETE FROM domains WHERE program_id = ?',
+                    [(program_id,) for program_id in program_ids],
+                )
+                self._connection.executemany(
+                    'DELETE FROM programs WHERE id = ?',
+                    [(program_id,) for program_id in program_ids],
+                )
+                self._connection.execute('COMMIT')
+            except Exception:
+                self._connection.execute('ROLLBACK')
+                raise
+
+    def set(
+        self,
+        program: dict[str, Any],
+        summary: str,
+        digests: dict[str, str] | None = None,
+    ) -> None:
+        """
+        Sets the snapshot of a program, replacing its domains.
+
+        :param program: Raw program details record.
+        :param summary: Digest of the program listing record.
+        :param digests: Domain digests by domain identifier, as computed
+         by ``get_domain_digests``. If None, they are computed.
+        """
+        domains: list[dict[str, Any]] = (program.get('domains') or {}).get(
+            'content'
+        ) or []
+        if digests is None:
+            digests: dict[str, str] = self.get_domain_digests(program)
+
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO programs '
+                    '(id, name, summary, digest, checked_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (
+                        program['id'],
+                        program['name'],
+                        summary,
+                        DictUtils.get_digest(digests),
+                        time.time(),
+                    ),
+                )
+                self._connection.execute(
+                    'DELETE FROM domains WHERE program_id = ?',
+                    (program['id'],),
+                )
+                self._connection.executemany(
+                    'INSERT INTO domains (program_id, id, digest, data) '
+                    'VALUES (?, ?, ?, ?)',
+                    [
+                        (
+                            program['id'],
+                            domain['id'],
+                            digests[domain['id']],
+                            json.dumps(domain, sort_keys=True),
+                        )
+                        for domain in domains
+                    ],
+                )
+                self._connection.execute('COMMIT')
+            except Exception:
+                self._connection.execute('ROLLBACK')
+                raise
@@ -40,3 +40,36 @@ class NotionParser:
         except Exception as ex:
             cls._logger.exception(str(ex), exc_info=True)
             raise
+
+    @classmethod
+    def to_property(cls, kind: str, value: Any) -> dict[str, Any]:
+        try:
+            if kind == 'select':
+                return {kind: {'name': value} if value else None}
+
+            if kind in {'rich_text', 'title'}:
+                return {kind: [{'text': {'content': value or ''}}]}
+
+            return {kind: value}
+
+        except Exception as ex:
+            cls._logger.exception(str(ex), exc_info=True)
+            raise
+
+    @classmethod
+    def to_property_value(cls, data: dict[str, Any]) -> Any:
+        try:
+            kind: str = data['type']
+            value: Any = data.get(kind)
+
+            if kind == 'select':
+                return value['name'] if value else None
+
+            if kind in {'rich_text', 'title'}:
+                return ''.join(text['plain_text'] for text in value or [])
+
+            return value
+
+        except Exception as ex:
+            cls._logger.exception(str(ex), exc_info=True)
+            raise
@@ -1,22 +1,33 @@
 import json
 import logging
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
+from nobu.clients.cache import CacheFactory, CacheIndex
 from nobu.clients.notion import NotionClient
 from nobu.clients.notion.filters import (
     FilterProperty,
     FilterValue,
     QueryFilter,
 )
+from nobu.clients.session import SessionFactory
+from nobu.commons import DictUtils
 from nobu.core.htb.entities import HtbMachine
 from nobu.core.notion import NotionDatabase, NotionPage
 from nobu.settings import Settings
 
 from .notion_parser import NotionParser
+from .notion_sync_index import NotionSyncIndex
 
 
 class NotionService:
+    htb_statuses: tuple[str, ...] = (
+        'Not Started',
+        'Started',
+        'Review',
+        'Done',
+    )
+
     def __init__(self) -> None:
         self.logger: logging.Logger = logging.getLogger(
             self.__class__.__name__
@@ -28,7 +39,46 @@ class NotionService:
         if not self.token:
             raise ValueError('could not find Notion token')
 
-        self.client: NotionClient = NotionClient(token=self.token)
+        self.client: NotionClient = NotionClient(
+            token=self.token,
+            timeout=self.settings.http_timeout,
+            session=SessionFactory.get_session(
+                pool_size=self.settings.http_pool_size,
+                retries=self.settings.http_retries,
+                backoff_factor=self.settings.http_backoff_factor,
+                cache_backend=self.settings.cache_backend,
+                cache_name=self.settings.cache_name,
+                cache_max_bytes=self.settings.cache_max_bytes,
+                cache_compress=self.settings.cache_compress,
+                cache_stale_while_revalidate=(
+                    self.settings.cache_stale_while_revalidate
+                ),
+            ),
+            cache_index=CacheIndex(
+                CacheFactory.get_db_path(
+                    self.settings.cache_backend, self.settings.cache_name
+                )
+            ),
+        )
+
+    @classmethod
+    def _to_htb_progress(
+        cls, machine: HtbMachine
+    ) -> dict[str, tuple[str, Any]]:
+        progress: dict[str, tuple[str, Any]] = {
+            'User Owned': ('checkbox', bool(machine.auth_user_in_user_owns)),
+            'Root Owned': ('checkbox', bool(machine.auth_user_in_root_owns)),
+            'Rating': ('number', machine.stars),
+        }
+
+        if machine.is_completed or (
+            machine.auth_user_in_user_owns and machine.auth_user_in_root_owns
+        ):
+            progress['Status'] = ('select', 'Done')
+        elif machine.auth_user_in_user_owns or machine.auth_user_in_root_owns:
+            progress['Status'] = ('select', 'Started')
+
+        return progress
 
     def add_htb_machine(self, machine: HtbMachine, db_id: str) -> None:
         try:
@@ -102,13 +152,14 @@ class NotionService:
             self.logger.exception(str(ex), exc_info=True)
             raise
 
-    def list_dbs(self) -> list[NotionDatabase]:
+    def list_dbs(self, update: bool = False) -> list[NotionDatabase]:
         try:
             response: dict[str, Any] = self.client.search_by_title(
                 query='',
                 query_filter=QueryFilter(
                     value=FilterValue.DATABASE, property=FilterProperty.OBJECT
                 ),
+                update=update,
             )
 
             dbs: list[NotionDatabase] = []
@@ -121,13 +172,14 @@ class NotionService:
             self.logger.exception(str(ex), exc_info=True)
             raise
 
-    def list_pages(self) -> list[NotionPage]:
+    def list_pages(self, update: bool = False) -> list[NotionPage]:
         try:
             response: dict[str, Any] = self.client.search_by_title(
                 query='',
                 query_filter=QueryFilter(
                     value=FilterValue.PAGE, property=FilterProperty.OBJECT
                 ),
+                update=update,
             )
 
             pages: list[NotionPage] = []
@@ -139,3 +191,80 @@ class NotionService:
         except Exception as ex:
             self.logger.exception(str(ex), exc_info=True)
             raise
+
+    def sync_htb_machines(
+        self, db_id: str, get_machine: Callable[[str], HtbMachine | None]
+    ) -> dict[str, list[str]]:
+        try:
+            sync_index: NotionSyncIndex = NotionSyncIndex(
+                Path(self.settings.data_dir) / 'notion.sqlite'
+            )
+            synced: dict[str, tuple[str, dict[str, str]]] = (
+                sync_index.get_all()
+            )
+            response: dict[str, Any] = self.client.query_database(db_id)
+
+            changes: dict[str, list[str]] = {}
+            for page in response['results']:
+                properties: dict[str, Any] = page['properties']
+                title: str | None = next(
+                    (
+                        NotionParser.to_property_value(value)
+                        for value in properties.values()
+                        if value['type'] == 'title'
+                    ),
+                    None,
+                )
+                machine: HtbMachine | None = (
+                    get_machine(title) if title else None
+                )
+                if not machine:
+                    continue
+
+                progress: dict[str, tuple[str, Any]] = {
+                    name: (kind, value)
+                    for name, (kind, value) in self._to_htb_progress(
+                        machine
+                    ).items()
+                    if properties.get(name, {}).get('type') == kind
+                }
+                digests: dict[str, str] = {
+                    name: DictUtils.get_digest(value)
+                    for name, value in progress.items()
+                }
+
+                digest, synced_digests = synced.get(page['id'], (None, {}))
+                if digest == DictUtils.get_digest(digests):
+                    changes[title] = []
+                    continue
+
+                changed: dict[str, Any] = {}
+                for name, (kind, value) in progress.items():
+                    current: Any = NotionParser.to_property_value(
+                        properties[name]
+                    )
+                    if synced_digests.get(name) == digests[name] or (
+                        current == value
+                    ):
+                        continue
+
+                    if name == 'Status' and (
+                        current in self.htb_statuses
+                        and self.htb_statuses.index(current)
+                        >= self.htb_statuses.index(value)
+                    ):
+                        continue
+
+                    changed[name] = NotionParser.to_property(kind, value)
+
+                if changed:
+                    self.client.update_page(page['id'], changed)
+
+                sync_index.set(page['id'], digests)
+                changes[title] = list(changed)
+
+            return changes
+
+        except Exception as ex:
+            self.logger.exception(str(ex), exc_info=True)
+            raise
@@ -0,0 +1,66 @@
+import json
+import sqlite3
+
+from nobu.commons import DictUtils, SqliteStore
+
+
+class NotionSyncIndex(SqliteStore):
+    """
+    Local index of the property values last synced into Notion pages.
+    Each page keeps a digest per synced property and a content digest
+    over all of them, so an unchanged page is skipped with a single
+    comparison and only the properties whose value changed since the
+    last sync are patched.
+    """
+
+    journal_mode: str | None = None
+    """Journal mode of the database. The default one is kept."""
+
+    def create_tables(self, connection: sqlite3.Connection) -> None:
+        """
+        Creates the index table if it does not exist.
+
+        :param connection: Database connection.
+        """
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS pages ('
+            '    page_id TEXT PRIMARY KEY,'
+            '    digest TEXT NOT NULL,'
+            '    properties TEXT NOT NULL'
+            ') WITHOUT ROWID'
+        )
+
+    def get_all(self) -> dict[str, tuple[str, dict[str, str]]]:
+        """
+        Gets the digests of every synced page.
+
+        :return: Content digest and property digests by page
+         identifier.
+        """
+        with self._lock:
+            rows: list[tuple[str, str, str]] = self._connection.execute(
+                'SELECT page_id, digest, properties FROM pages'
+            ).fetchall()
+
+        return {
+            page_id: (digest, json.loads(properties))
+            for page_id, digest, properties in rows
+        }
+
+    def set(self, page_id: str, properties: dict[str, str]) -> None:
+        """
+        Sets the property digests of a synced page.
+
+        :param page_id: Notion page identifier.
+        :param properties: Digest of each synced property value.
+        """
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO pages (page_id, digest, properties) '
+                'VALUES (?, ?, ?)',
+                (
+                    page_id,
+                    DictUtils.get_digest(properties),
+                    json.dumps(properties, sort_keys=True),
+                ),
+            )
@@ -6,7 +6,19 @@ class Settings(BaseSettings):
         env_file='.env', env_file_encoding='utf-8', extra='ignore'
     )
 
+    cache_backend: str = 'filesystem'
+    cache_compress: bool = True
+    cache_max_bytes: int = 100 * 1024 * 1024
+    cache_name: str = '.cache'
+    cache_stale_while_revalidate: int = 24 * 60 * 60
+    data_dir: str = '.nobu'
     htb_token: str | None = None
+    http_backoff_factor: float = 0.5
+    http_pool_size: int = 10
+    http_retries: int = 3
+    http_timeout: int = 30
+    intigriti_prefetch_size: int = 100
+    intigriti_prefetch_workers: int = 4
     intigriti_token: str | None = None
     notion_root_page_id: str | None = None
     notion_token: str | None = None
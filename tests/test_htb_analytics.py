@@ -0,0 +1,24 @@
+import numpy as np
+
+from nobu.core.htb.htb_analytics import HtbAnalytics
+
+
+def test_percentiles_share_rank_of_tied_values():
+    percentiles = HtbAnalytics._percentiles(
+        np.array([3.0, 1.0, 3.0, np.nan, 5.0, 3.0])
+    )
+
+    assert np.isnan(percentiles[3])
+    assert np.delete(percentiles, 3).tolist() == [50.0, 0.0, 50.0, 100.0, 50.0]
+
+
+def test_percentiles_of_equal_values():
+    percentiles = HtbAnalytics._percentiles(np.array([2.0, 2.0, 2.0]))
+
+    assert percentiles.tolist() == [50.0, 50.0, 50.0]
+
+
+def test_percentiles_of_missing_values():
+    percentiles = HtbAnalytics._percentiles(np.array([np.nan, np.nan]))
+
+    assert np.isnan(percentiles).all()